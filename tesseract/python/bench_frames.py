@@ -0,0 +1,165 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import sys
+import time
+
+import pygame
+
+import tesseract
+
+# one palette per family: static, rainbow, hue shift
+PALETTE_FAMILIES = {"static": 0, "rainbow": tesseract.RAINBOW_PALETTE_IDX, "shift": 22}
+INSTANCE_COUNTS = [10, 100, 1000]
+# p50 changes smaller than this are timer noise, whatever they are in
+# relative terms (present takes ~0 ms when nothing is upscaled)
+MIN_REGRESSION_MS = 0.05
+
+
+def select_palette(app, idx):
+    app.palette_set_idx, app.palette_idx_in_set = divmod(idx, 10)
+    app.update_current_palette()
+
+
+def time_stage(frames, setup, stage):
+    samples = []
+    for frame in range(1, frames + 1):
+        setup(frame)
+        t0 = time.perf_counter_ns()
+        stage()
+        samples.append((time.perf_counter_ns() - t0) / 1e6)
+    return samples
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    n = len(ordered)
+    return {
+        "mean": sum(ordered) / n,
+        "p50": ordered[(n - 1) // 2],
+        "p99": ordered[min(n - 1, int(n * 0.99))],
+        "max": ordered[-1],
+    }
+
+
+def run_suite(frames, dims, size, seed, render_scale):
+    app = tesseract.TesseractApp(dimensions=dims, seed=seed, audio=False, render_scale=render_scale)
+    pygame.display.set_mode(size)
+    app.resize()
+    results = {}
+
+    def geometry_setup(frame):
+        app.game_surface.fill((0, 0, 0))
+        app.set_frame(frame)
+
+    for family, idx in PALETTE_FAMILIES.items():
+        select_palette(app, idx)
+        results[f"tesseract[{family}]"] = time_stage(frames, geometry_setup, app.draw_tesseract)
+    select_palette(app, 0)
+
+    # chaos colors come from the app's seeded chaos engine
+    app.chaos_mode = True
+    results["tesseract[chaos]"] = time_stage(frames, geometry_setup, app.draw_tesseract)
+    app.chaos_mode = False
+
+    app.culling = True
+    results["tesseract[cull]"] = time_stage(frames, geometry_setup, app.draw_tesseract)
+    app.culling = False
+
+    # the trails blur style redraws the last frames' geometry inside draw_tesseract
+    app.blur_style = "trails"
+    results["tesseract[trails]"] = time_stage(frames, geometry_setup, app.draw_tesseract)
+    app.blur_style = tesseract.BLUR_STYLES[0]
+
+    # the glow pass on a drawn frame, with its upscale and add at present
+    def bloom_setup(frame):
+        geometry_setup(frame)
+        app.draw_tesseract()
+
+    app.set_bloom(True)
+    results["bloom"] = time_stage(frames, bloom_setup, lambda: (app.render_bloom(), app.present()))
+    app.set_bloom(False)
+
+    for count in INSTANCE_COUNTS:
+        app.set_instances(count, seed)
+        results[f"instances[{count}]"] = time_stage(frames, geometry_setup, app.draw_instances)
+    app.set_instances(1)
+
+    results["hud"] = time_stage(frames, geometry_setup, app.draw_hud)
+    # menus normally repaint only changed lines; time the full redraw
+    def menu_setup(frame):
+        app.set_frame(frame)
+        app.invalidate_menu()
+
+    results["main_menu"] = time_stage(frames, menu_setup, app.draw_main_menu)
+    results["palette_menu"] = time_stage(frames, menu_setup, app.draw_palette_menu)
+    app.keybind_fade.fade_in()
+    results["keybind_menu"] = time_stage(frames, app.set_frame, app.draw_keybind_menu)
+    results["motion_blur"] = time_stage(
+        frames, app.set_frame, lambda: app.game_surface.blit(app.motion_blur_surface, (0, 0)))
+    results["present"] = time_stage(frames, app.set_frame, app.present)
+
+    return {stage: summarize(samples) for stage, samples in results.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time each render stage headlessly")
+    parser.add_argument("--frames", type=int, default=300, help="frames per stage (default 300)")
+    parser.add_argument("--dims", type=int, default=tesseract.DEFAULT_DIMENSIONS,
+                        choices=range(tesseract.MIN_DIMENSIONS, tesseract.MAX_DIMENSIONS + 1), metavar="N")
+    parser.add_argument("--size", default="1920x1080", help="output resolution, WxH")
+    parser.add_argument("--render-scale", type=float, default=1.0,
+                        help="fraction of the output resolution to render at (default 1)")
+    parser.add_argument("--seed", type=tesseract.seed_arg, default=0, help="seed for rotation speeds and chaos colors")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier --save to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed p50 slowdown per stage vs the baseline (default 0.2)")
+    args = parser.parse_args(argv)
+
+    try:
+        size = tuple(int(n) for n in args.size.lower().split("x"))
+    except ValueError:
+        parser.error("--size must look like 1920x1080")
+
+    stages = run_suite(args.frames, args.dims, size, args.seed, args.render_scale)
+
+    print(f"{args.frames} frames, {args.dims}D, {size[0]}x{size[1]} output at {args.render_scale:g}x (ms)")
+    print(f"{'stage':<20}{'mean':>9}{'p50':>9}{'p99':>9}{'max':>9}")
+    for stage, stats in stages.items():
+        print(f"{stage:<20}" + "".join(f"{stats[k]:>9.3f}" for k in ("mean", "p50", "p99", "max")))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"frames": args.frames, "dims": args.dims, "size": size, "seed": args.seed,
+                       "render_scale": args.render_scale, "stages": stages}, f, indent=2)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for key, value in (("frames", args.frames), ("dims", args.dims), ("size", list(size)),
+                           ("render_scale", args.render_scale)):
+            if baseline.get(key) != value:
+                print(f"\nWarning: baseline {key} is {baseline.get(key)}, this run used {value}")
+        baseline = baseline["stages"]
+        print(f"\n{'stage':<20}{'base p50':>10}{'p50':>10}{'change':>9}")
+        for stage, stats in stages.items():
+            if stage not in baseline:
+                continue
+            before = baseline[stage]["p50"]
+            change = stats["p50"] / before - 1 if before else 0.0
+            slower = stats["p50"] - before > MIN_REGRESSION_MS
+            flag = "  REGRESSION" if change > args.tolerance and slower else ""
+            print(f"{stage:<20}{before:>10.3f}{stats['p50']:>10.3f}{change:>+9.1%}{flag}")
+            if flag:
+                status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+STAGES = ["import", "app_init", "first_frame"]
+
+
+def child(dims):
+    # timestamps are perf_counter values, which share a clock with the parent
+    marks = {}
+    import pygame
+    import tesseract
+    marks["import"] = time.perf_counter()
+
+    flip = pygame.display.flip
+
+    def timed_flip():
+        flip()
+        marks.setdefault("first_frame", time.perf_counter())
+
+    pygame.display.flip = timed_flip
+    app = tesseract.TesseractApp(dimensions=dims, seed=0)
+    marks["app_init"] = time.perf_counter()
+    app.run(max_frames=1)
+    print(json.dumps(marks))
+
+
+def measure(dims, headless):
+    env = dict(os.environ)
+    if headless:
+        env.setdefault("SDL_VIDEODRIVER", "dummy")
+        env.setdefault("SDL_AUDIODRIVER", "dummy")
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", "--dims", str(dims)]
+    t0 = time.perf_counter()
+    out = subprocess.run(cmd, env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                         capture_output=True, text=True, check=True).stdout
+    marks = json.loads(out.strip().splitlines()[-1])
+    return {stage: (marks[stage] - t0) * 1000 for stage in STAGES}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold start to first presented frame")
+    parser.add_argument("--runs", type=int, default=10, help="measured launches (default 10)")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured launches first (default 1)")
+    parser.add_argument("--dims", type=int, default=5)
+    parser.add_argument("--headless", action="store_true", help="use SDL's dummy video and audio drivers")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier --save to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed slowdown of the median first frame vs the baseline (default 0.2)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(args.dims)
+        return 0
+
+    for _ in range(args.warmup):
+        measure(args.dims, args.headless)
+    samples = {stage: [] for stage in STAGES}
+    for _ in range(args.runs):
+        for stage, ms in measure(args.dims, args.headless).items():
+            samples[stage].append(ms)
+
+    results = {
+        "dims": args.dims,
+        "headless": args.headless,
+        "runs": args.runs,
+        "median_ms": {stage: statistics.median(v) for stage, v in samples.items()},
+        "min_ms": {stage: min(v) for stage, v in samples.items()},
+        "max_ms": {stage: max(v) for stage, v in samples.items()},
+        "samples_ms": samples,
+    }
+
+    print(f"{'stage':<12}{'median':>10}{'min':>10}{'max':>10}  (ms since launch)")
+    for stage in STAGES:
+        print(f"{stage:<12}{results['median_ms'][stage]:>10.1f}{results['min_ms'][stage]:>10.1f}{results['max_ms'][stage]:>10.1f}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        before = baseline["median_ms"]["first_frame"]
+        after = results["median_ms"]["first_frame"]
+        change = after / before - 1
+        print(f"first frame: {before:.1f} ms -> {after:.1f} ms ({change:+.1%})")
+        if change > args.tolerance:
+            print(f"Startup regression over the {args.tolerance:.0%} tolerance")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import argparse
+import socket
+import sys
+import time
+
+import tesseract
+
+
+def send(sock, address, text, timeout):
+    sock.sendto(text.encode(), address)
+    sock.settimeout(timeout)
+    try:
+        reply, _ = sock.recvfrom(65536)
+    except socket.timeout:
+        return None
+    return reply.decode(errors="replace")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Send a command to a visualizer started with --control-port",
+        epilog="commands: ping | palette N|next | chaos on|off|toggle | speed PLANE|all VALUE | "
+               "state visualization|menu|palette|keybinds | blur on|off|screen|trails | quit")
+    parser.add_argument("command", nargs="+", help="command words, e.g. palette 12")
+    parser.add_argument("--port", type=int, default=tesseract.CONTROL_PORT)
+    parser.add_argument("--burst", type=int, default=1, metavar="N",
+                        help="send the command N times back to back and report the replies")
+    parser.add_argument("--timeout", type=float, default=1.0, help="seconds to wait for each reply")
+    args = parser.parse_args(argv)
+
+    address = ("127.0.0.1", args.port)
+    text = " ".join(args.command)
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        if args.burst == 1:
+            reply = send(sock, address, text, args.timeout)
+            if reply is None:
+                print(f"no reply from port {args.port}")
+                return 1
+            print(reply)
+            return 0 if not reply.startswith("error") else 1
+
+        # replies are read between sends so they don't overflow the socket buffer
+        t0 = time.perf_counter()
+        replies = 0
+        sock.setblocking(False)
+        for _ in range(args.burst):
+            sock.sendto(text.encode(), address)
+            try:
+                while True:
+                    sock.recvfrom(65536)
+                    replies += 1
+            except BlockingIOError:
+                pass
+        sock.settimeout(args.timeout)
+        try:
+            while replies < args.burst:
+                sock.recvfrom(65536)
+                replies += 1
+        except socket.timeout:
+            pass
+        elapsed = time.perf_counter() - t0
+        print(f"{replies}/{args.burst} replies in {elapsed * 1000:.1f} ms")
+        return 0 if replies == args.burst else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
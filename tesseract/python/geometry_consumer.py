@@ -0,0 +1,35 @@
+import argparse
+import sys
+import time
+
+import tesseract
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read the geometry stream of a visualizer run with --export-geometry")
+    parser.add_argument("path", nargs="?", default=tesseract.DEFAULT_GEOMETRY_PATH)
+    parser.add_argument("--rate", type=float, default=10.0, help="reads per second (default 10)")
+    parser.add_argument("--seconds", type=float, default=5.0, help="how long to read for (default 5)")
+    args = parser.parse_args(argv)
+
+    reader = tesseract.GeometryReader(args.path)
+    print(f"{len(reader.points[0])} vertices, {len(reader.edges)} edges, "
+          f"coordinates in a {reader.canvas_size}x{reader.canvas_size} canvas")
+    last_count = None
+    end = time.perf_counter() + args.seconds
+    while time.perf_counter() < end:
+        frame = reader.read()
+        if frame is not None:
+            count, index, tick, palette, points = frame
+            skipped = count - last_count - 1 if last_count is not None else 0
+            lo = points.min(axis=0)
+            hi = points.max(axis=0)
+            print(f"frame {index:>7} tick {tick:>7} palette {palette[0].tolist()} "
+                  f"bounds ({lo[0]:.0f}, {lo[1]:.0f})-({hi[0]:.0f}, {hi[1]:.0f}) skipped {skipped}")
+            last_count = count
+        time.sleep(1 / args.rate)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+import os
+
+# no window or audio device is needed for offline renders
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+# SDL would otherwise swallow the SIGTERM used to stop pool workers
+os.environ.setdefault("SDL_NO_SIGNAL_HANDLERS", "1")
+
+import argparse
+import multiprocessing
+import sys
+import time
+
+import pygame
+
+import tesseract
+
+# motion blur depends on earlier frames, so each chunk first renders this
+# many frames before its start; after 24 frames the remaining trail is ~1%
+BLUR_WARMUP_FRAMES = 24
+
+_worker = {}
+
+
+def palette_index(value):
+    if value.isdigit():
+        idx = int(value) - 1
+        if not 0 <= idx < len(tesseract.ALL_PALETTES):
+            raise ValueError(f"palette number must be 1 to {len(tesseract.ALL_PALETTES)}")
+        return idx
+    names = [name.lower() for name in tesseract.PALETTE_NAMES[:len(tesseract.ALL_PALETTES)]]
+    if value.lower() not in names:
+        raise ValueError(f"unknown palette {value!r}")
+    return names.index(value.lower())
+
+
+def init_worker(options):
+    app = tesseract.TesseractApp(dimensions=options["dims"], seed=options["seed"], audio=False,
+                                 render_scale=options["render_scale"])
+    # frames are drawn straight into an output-sized dummy window
+    pygame.display.set_mode(options["size"])
+    app.resize()
+    app.motion_blur = options["motion_blur"]
+    app.blur_style = options["blur"]
+    app.palette_set_idx, app.palette_idx_in_set = divmod(options["palette"], 10)
+    app.update_current_palette()
+    _worker["app"] = app
+    _worker["options"] = options
+
+
+def draw_frame(app, frame):
+    app.clear_canvas()
+    app.set_frame(frame)
+    app.draw_tesseract()
+    app.present()
+
+
+def render_chunk(chunk):
+    first, last = chunk
+    app = _worker["app"]
+    options = _worker["options"]
+    size = options["size"]
+
+    app.game_surface.fill((0, 0, 0))
+    app.trail_count = 0
+    if app.motion_blur:
+        for frame in range(max(1, first - BLUR_WARMUP_FRAMES), first):
+            draw_frame(app, frame)
+
+    out = None
+    if options["format"] == "raw":
+        out = open(options["output"], "r+b")
+    try:
+        for frame in range(first, last):
+            draw_frame(app, frame)
+            surface = app.display_surface
+            if out is None:
+                path = os.path.join(options["output"], f"frame_{frame:05d}.png")
+                pygame.image.save(surface, path)
+            else:
+                out.seek((frame - options["start"]) * size[0] * size[1] * 3)
+                out.write(pygame.image.tobytes(surface, "RGB"))
+    finally:
+        if out is not None:
+            out.close()
+    return last - first
+
+
+def split_frames(start, end, chunk_size):
+    return [(first, min(first + chunk_size, end)) for first in range(start, end, chunk_size)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render hypercube frames offline without a display")
+    parser.add_argument("output", help="directory for PNG frames, or file for --format raw")
+    parser.add_argument("--start", type=int, default=1, help="first frame index (default 1)")
+    parser.add_argument("--frames", type=int, default=600, help="number of frames (default 600)")
+    parser.add_argument("--size", default=f"{tesseract.GAME_SIZE}x{tesseract.GAME_SIZE}",
+                        help="output resolution as WxH (default %(default)s)")
+    parser.add_argument("--palette", default="1", help="palette name or 1-based number (default 1)")
+    parser.add_argument("--seed", type=tesseract.seed_arg, default=0, help="seed for the rotation speeds (default 0)")
+    parser.add_argument("--dims", type=int, default=tesseract.DEFAULT_DIMENSIONS,
+                        choices=range(tesseract.MIN_DIMENSIONS, tesseract.MAX_DIMENSIONS + 1), metavar="N",
+                        help=f"hypercube dimension (default {tesseract.DEFAULT_DIMENSIONS})")
+    parser.add_argument("--format", choices=["png", "raw"], default="png",
+                        help="numbered PNGs, or one raw RGB24 file with frames back to back")
+    parser.add_argument("--render-scale", type=float, default=1.0,
+                        help="render below the output resolution and upscale (default 1)")
+    parser.add_argument("--no-motion-blur", dest="motion_blur", action="store_false")
+    parser.add_argument("--blur", choices=tesseract.BLUR_STYLES, default=tesseract.BLUR_STYLES[0],
+                        help="motion blur style (default %(default)s)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--chunk", type=int, default=0,
+                        help="frames per task (default: spread evenly over the workers)")
+    args = parser.parse_args(argv)
+
+    try:
+        width, height = (int(n) for n in args.size.lower().split("x"))
+        palette = palette_index(args.palette)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.frames < 1 or args.start < 0:
+        parser.error("--frames must be positive and --start non-negative")
+
+    options = {
+        "output": args.output,
+        "start": args.start,
+        "size": (width, height),
+        "palette": palette,
+        "seed": args.seed,
+        "dims": args.dims,
+        "format": args.format,
+        "motion_blur": args.motion_blur,
+        "blur": args.blur,
+        "render_scale": args.render_scale,
+    }
+    if args.format == "png":
+        os.makedirs(args.output, exist_ok=True)
+    else:
+        with open(args.output, "wb") as f:
+            f.truncate(args.frames * width * height * 3)
+
+    end = args.start + args.frames
+    jobs = max(1, min(args.jobs, args.frames))
+    chunks = split_frames(args.start, end, args.chunk or -(-args.frames // jobs))
+
+    t0 = time.perf_counter()
+    done = 0
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(jobs, initializer=init_worker, initargs=(options,)) as pool:
+        for count in pool.imap_unordered(render_chunk, chunks):
+            done += count
+            print(f"\r{done}/{args.frames} frames", end="", flush=True)
+        pool.close()
+        pool.join()
+    elapsed = time.perf_counter() - t0
+    print(f"\nRendered {args.frames} frames in {elapsed:.1f}s ({args.frames / elapsed:.1f} fps) with {jobs} workers")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,40 @@
 import pygame
+import pygame.gfxdraw
+import argparse
+import asyncio
 import math
 import random
 import sys
 import os
 import time
 import colorsys
+import csv
+import hashlib
+import itertools
+import mmap
+import struct
+import tempfile
+import queue
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from collections import OrderedDict, defaultdict, deque
+
+import numpy as np
 
 
 GAME_SIZE = 800
+
+# the simulation advances in fixed steps; rotation speeds and palette
+# animations are tuned per step, at the rate the app originally ran at
+SIM_HZ = 60
+SIM_STEP = 1.0 / SIM_HZ
+# after a stall, at most this much time is caught up in one frame
+MAX_FRAME_TIME = 0.25
+
+# idle menus block on input for up to this long (ms) before looping
+MENU_IDLE_TIMEOUT = 500
+MENU_SETTLE_FRAMES = 15
 BASEDIR = os.path.dirname(os.path.abspath(__file__))
 
 # try ../assets first (tesseract/python/tesseract.py)
@@ -21,6 +48,14 @@ else:
 
 CONTROL_STYLES = ['auto', 'manual']
 
+# "screen" fades the whole canvas each frame; "trails" redraws the last few
+# frames of geometry with decaying color, so its cost follows the vertex count
+BLUR_STYLES = ['screen', 'trails']
+# each stored frame costs a full redraw of the edges, so trails are kept
+# short and fade faster than the screen blur's alpha 40 per frame
+TRAIL_LENGTH = 6
+TRAIL_DECAY = 0.7
+
 PALETTE_NAMES = [
     "Matrix Green", "Rainbow Cycle", "Cyberpunk Neon", "Vaporwave Pastel", "Monochrome Gray",
     "Ocean Blue", "Sunset Glow", "Forest Deep", "Fire Blaze", "Pastel Dream",
@@ -76,85 +111,550 @@ for set_idx in range(4, 11):
     if len(ALL_PALETTES) >= 100:
         break
 
-pygame.init()
-pygame.mixer.init()
-
-display_surface = pygame.display.set_mode((GAME_SIZE, GAME_SIZE), pygame.RESIZABLE)
-pygame.display.set_caption("4D Cube (Tesseract)")
-clock = pygame.time.Clock()
-
 FONT_PATH = os.path.join(ASSETSDIR, "VCR_OSD_MONO.ttf")
-try:
-    font = pygame.font.Font(FONT_PATH, 24)
-    big_font = pygame.font.Font(FONT_PATH, 50)
-except FileNotFoundError:
-    font = pygame.font.SysFont('Arial', 24)
-    big_font = pygame.font.SysFont('Arial', 50)
+FONT_SIZES = (24, 50, 16)
+MUSIC_FILE = "cell_to_singularity.wav"
+# each sound name lists its variants, one picked at random per play
+SOUND_FILES = {
+    'startup': ["startup_sound.wav"],
+    'escape': ["escape_sound.wav"],
+    'beep': [f"beep{i}.wav" for i in range(1, 4)],
+}
+SOUND_CATEGORIES = {'startup': 'cue', 'escape': 'cue', 'beep': 'ui'}
+# channels reserved per category; a busy category steals its own oldest
+# voice rather than taking one from another
+VOICE_LIMITS = {'ui': 3, 'cue': 2}
+# a sound asked for before it finished loading still plays if it is ready
+# within this many ms
+DEFERRED_SOUND_MS = 500
+
+# set up by init_pygame, so importing this module opens no window or device
+display_surface = None
+clock = None
+font = None
+big_font = None
+small_font = None
+assets = None
+
+_font_cache = {}
+
+def load_font(size):
+    cached = _font_cache.get(size)
+    if cached is None:
+        try:
+            cached = pygame.font.Font(FONT_PATH, size)
+        except FileNotFoundError:
+            cached = pygame.font.SysFont('Arial', size)
+        _font_cache[size] = cached
+    return cached
+
+def set_font_scale(scale):
+    # font sizes are designed for a GAME_SIZE canvas and follow the real one
+    global font, big_font, small_font
+    font = load_font(max(8, round(24 * scale)))
+    big_font = load_font(max(8, round(50 * scale)))
+    small_font = load_font(max(8, round(16 * scale)))
 
 def load_sound(name):
-    path = os.path.join(ASSETSDIR, name)
-    try:
-        return pygame.mixer.Sound(path)
-    except pygame.error as e:
-        print(f"Warning: Could not load sound {name}: {e}")
-        return None
+    # Sound decodes the whole file up front, so playing it never touches disk
+    return pygame.mixer.Sound(os.path.join(ASSETSDIR, name))
+
+class VoicePool:
+    # reserved mixer channels split by category. Each play takes the
+    # category's least recently started channel, so a burst of key repeats
+    # cuts its own oldest voice instead of searching for a free channel.
+    def __init__(self, limits=VOICE_LIMITS):
+        total = sum(limits.values())
+        pygame.mixer.set_num_channels(max(total, pygame.mixer.get_num_channels()))
+        pygame.mixer.set_reserved(total)
+        ids = iter(range(total))
+        self.channels = {category: [pygame.mixer.Channel(next(ids)) for _ in range(n)]
+                         for category, n in limits.items()}
+        self.next = dict.fromkeys(limits, 0)
+
+    def play(self, category, sound):
+        channels = self.channels[category]
+        i = self.next[category]
+        self.next[category] = (i + 1) % len(channels)
+        channels[i].play(sound)
+
+class AssetLoader:
+    # loads fonts, then opens the mixer and loads sounds and music, on a
+    # background thread. The main thread only waits for the fonts; sounds
+    # are played by name and skipped (or briefly deferred) until loaded.
+    def __init__(self, audio=True):
+        self.audio = audio
+        self.font_ready = threading.Event()
+        self.done = threading.Event()
+        self.sounds = {}
+        self.pool = None
+        self.music_loaded = False
+        self.missing = []
+        self.deferred = {}
+        self.rng = random.Random()
+        self.thread = threading.Thread(target=self.load, daemon=True)
+
+    def start(self):
+        # an idle menu sleeps in pygame.event.wait, so finishing posts this
+        # event to wake it for any deferred sounds
+        self.loaded_event = pygame.event.custom_type()
+        self.thread.start()
+
+    def load(self):
+        try:
+            if not os.path.exists(FONT_PATH):
+                self.missing.append(os.path.basename(FONT_PATH))
+            for size in FONT_SIZES:
+                load_font(size)
+        finally:
+            self.font_ready.set()
+        if self.audio:
+            self.load_audio()
+        if self.missing:
+            print(f"Warning: missing assets, running without them: {', '.join(self.missing)}")
+        self.done.set()
+        pygame.event.post(pygame.event.Event(self.loaded_event))
+
+    def load_audio(self):
+        try:
+            pygame.mixer.init()
+        except pygame.error as e:
+            print(f"Warning: Could not open audio device: {e}")
+            return
+        self.pool = VoicePool()
+        for name, files in SOUND_FILES.items():
+            variants = []
+            for file in files:
+                try:
+                    variants.append(load_sound(file))
+                except (pygame.error, FileNotFoundError):
+                    self.missing.append(file)
+            if variants:
+                self.sounds[name] = variants
+        try:
+            pygame.mixer.music.load(os.path.join(ASSETSDIR, MUSIC_FILE))
+            self.music_loaded = True
+        except (pygame.error, FileNotFoundError):
+            self.missing.append(MUSIC_FILE)
+
+    def play(self, name):
+        variants = self.sounds.get(name)
+        if variants:
+            self.pool.play(SOUND_CATEGORIES[name], self.rng.choice(variants))
+        elif not self.done.is_set():
+            self.deferred[name] = pygame.time.get_ticks()
 
-try:
-    pygame.mixer.music.load(os.path.join(ASSETSDIR, "cell_to_singularity.wav"))
-except pygame.error as e:
-    print(f"Warning: Could not load background music: {e}")
-
-startup_sound = load_sound("startup_sound.wav")
-escape_sound = load_sound("escape_sound.wav")
-beep_sounds = [load_sound(f"beep{i}.wav") for i in range(1, 4)]
-
-def generate_points():
-    points = []
-    for x in [-1,1]:
-        for y in [-1,1]:
-            for z in [-1,1]:
-                for w in [-1,1]:
-                    for v in [-1,1]:
-                        points.append([x,y,z,w,v])
-    return points
-
-def generate_edges(points):
+    def update(self):
+        # plays sounds asked for while still loading, unless they went stale
+        if not self.deferred:
+            return
+        now = pygame.time.get_ticks()
+        for name, asked in list(self.deferred.items()):
+            if name in self.sounds or self.done.is_set():
+                del self.deferred[name]
+                if now - asked < DEFERRED_SOUND_MS:
+                    self.play(name)
+
+    def close(self):
+        # pygame.quit must not run under a load in progress
+        self.thread.join()
+
+def init_pygame(audio=True):
+    global display_surface, clock, assets
+    # a finished app's pygame.quit() leaves the globals set, so check the
+    # display itself before reusing them
+    if display_surface is not None and pygame.display.get_init():
+        return
+
+    # fonts and surfaces cached by an earlier app died with its pygame.quit()
+    _font_cache.clear()
+    text_cache.surfaces.clear()
+    _dot_sprites.clear()
+    pygame.display.init()
+    pygame.font.init()
+    assets = AssetLoader(audio)
+    assets.start()
+
+    display_surface = pygame.display.set_mode((GAME_SIZE, GAME_SIZE), pygame.RESIZABLE)
+    pygame.display.set_caption("4D Cube (Tesseract)")
+    clock = pygame.time.Clock()
+
+    assets.font_ready.wait()
+    set_font_scale(1.0)
+
+DEFAULT_DIMENSIONS = 5
+MIN_DIMENSIONS = 3
+MAX_DIMENSIONS = 12
+AXIS_NAMES = "xyzwvutsrqpo"
+AXIS_INDEX = {name: i for i, name in enumerate(AXIS_NAMES)}
+
+def generate_points(dims=DEFAULT_DIMENSIONS):
+    # vertex i has coordinate k = +1 where bit (dims-1-k) of i is set
+    idx = np.arange(1 << dims)
+    bits = (idx[:, None] >> np.arange(dims - 1, -1, -1)) & 1
+    return (bits * 2 - 1).astype(np.int8)
+
+def generate_edges(dims=DEFAULT_DIMENSIONS):
+    # every edge joins a vertex to the one with a single bit flipped
+    idx = np.arange(1 << dims, dtype=np.int32)
     edges = []
-    for i in range(len(points)):
-        for j in range(i+1,len(points)):
-            diff = sum(points[i][k] != points[j][k] for k in range(5))
-            if diff == 1:
-                edges.append((i,j))
-    return edges
-
-def rotate_5d(point, angles):
-    x,y,z,w,v = point
-    def rotate(a,b,angle):
+    for bit in range(dims - 1, -1, -1):
+        lows = idx[(idx & (1 << bit)) == 0]
+        edges.append(np.stack((lows, lows | (1 << bit)), axis=1))
+    edges = np.concatenate(edges)
+    return edges[np.lexsort((edges[:, 1], edges[:, 0]))]
+
+SHAPES = ['hypercube', '24-cell', '600-cell', '120-cell']
+# bump when a generator changes so stale cached meshes are rebuilt
+MESH_VERSION = 1
+MESH_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+                              "tesseract", "meshes")
+PHI = (1 + math.sqrt(5)) / 2
+
+def signed_permutations(values, even_only=False):
+    # every sign choice of every (even) permutation of values, duplicates
+    # from zeros removed
+    perms = []
+    for perm in itertools.permutations(range(len(values))):
+        inversions = sum(perm[i] > perm[j] for i in range(len(perm)) for j in range(i + 1, len(perm)))
+        if not even_only or inversions % 2 == 0:
+            perms.append(perm)
+    signs = np.array(list(itertools.product((1, -1), repeat=len(values))))
+    out = (np.array(values)[np.array(perms)][:, None, :] * signs[None]).reshape(-1, len(values))
+    return np.unique(out, axis=0)
+
+def polytope_24cell():
+    return signed_permutations((1, 1, 0, 0)) / math.sqrt(2)
+
+def polytope_600cell():
+    return np.concatenate((
+        signed_permutations((1, 0, 0, 0)),
+        signed_permutations((0.5, 0.5, 0.5, 0.5)),
+        signed_permutations((PHI / 2, 0.5, 1 / (2 * PHI), 0), even_only=True),
+    ))
+
+def polytope_120cell():
+    # the dual of the 600-cell: one vertex at the center of each of its 600
+    # tetrahedral cells, i.e. each 4-clique of its edge graph
+    points = polytope_600cell()
+    edges = neighbor_edges(points)
+    adjacent = np.zeros((len(points), len(points)), dtype=bool)
+    adjacent[edges[:, 0], edges[:, 1]] = adjacent[edges[:, 1], edges[:, 0]] = True
+    cells = []
+    for a, b in edges.tolist():
+        common = np.flatnonzero(adjacent[a] & adjacent[b])
+        common = common[common > b].tolist()
+        for i, c in enumerate(common):
+            cells += [(a, b, c, d) for d in common[i + 1:] if adjacent[c, d]]
+    centers = points[np.array(cells)].mean(axis=1)
+    return centers / np.linalg.norm(centers, axis=1, keepdims=True)
+
+POLYTOPE_GENERATORS = {'24-cell': polytope_24cell, '600-cell': polytope_600cell, '120-cell': polytope_120cell}
+
+def grid_pairs(points, cell):
+    # pairs (i < j) that share or neighbour a grid cell of the given size,
+    # which includes every pair closer than cell. Only the first four axes
+    # are gridded; the 3**k neighbour cells get out of hand beyond that.
+    k = min(points.shape[1], 4)
+    cells = np.floor((points[:, :k] - points[:, :k].min(axis=0)) / cell).astype(np.int64) + 1
+    radix = np.cumprod(np.concatenate(([1], cells.max(axis=0)[:-1] + 2)))
+    keys = cells @ radix
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    pairs = []
+    for offset in itertools.product((-1, 0, 1), repeat=k):
+        neighbour = keys + np.dot(offset, radix)
+        lo = np.searchsorted(sorted_keys, neighbour, "left")
+        counts = np.searchsorted(sorted_keys, neighbour, "right") - lo
+        i = np.repeat(np.arange(len(points)), counts)
+        starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+        j = order[starts + np.arange(counts.sum())]
+        keep = i < j
+        pairs.append(np.stack((i[keep], j[keep]), axis=1))
+    return np.concatenate(pairs)
+
+def neighbor_edges(points, tolerance=1e-6):
+    # edges join the vertex pairs at the shortest distance in the set, found
+    # through a spatial grid instead of checking all pairs
+    points = np.asarray(points, dtype=float)
+    extent = np.ptp(points, axis=0).max() or 1.0
+    cell = extent / len(points) ** (1 / points.shape[1])
+    while True:
+        pairs = grid_pairs(points, cell)
+        if len(pairs):
+            lengths = np.linalg.norm(points[pairs[:, 0]] - points[pairs[:, 1]], axis=1)
+            shortest = lengths.min()
+            # only a pair closer than the cell size is sure to be the closest
+            if shortest <= cell:
+                break
+        cell *= 2
+    pairs = grid_pairs(points, shortest * (1 + tolerance))
+    lengths = np.linalg.norm(points[pairs[:, 0]] - points[pairs[:, 1]], axis=1)
+    edges = pairs[lengths <= shortest * (1 + tolerance)].astype(np.int32)
+    return edges[np.lexsort((edges[:, 1], edges[:, 0]))]
+
+def load_mesh(shape, vertices=None):
+    # (points, edges) for a named polytope or a user vertex list, scaled to
+    # unit circumradius and cached on disk as .npz
+    if vertices is not None:
+        vertices = np.asarray(vertices, dtype=float)
+        # a repeated vertex would make the shortest distance 0
+        _, first = np.unique(vertices, axis=0, return_index=True)
+        vertices = vertices[np.sort(first)]
+        digest = hashlib.sha1(vertices.tobytes() + str(vertices.shape).encode()).hexdigest()[:16]
+        key = f"custom-{digest}"
+    else:
+        key = shape
+    path = os.path.join(MESH_CACHE_DIR, f"{key}-v{MESH_VERSION}.npz")
+    try:
+        with np.load(path) as mesh:
+            return mesh["points"], mesh["edges"].astype(np.int32)
+    except Exception:
+        # missing, stale or damaged (zipfile.BadZipFile, EOFError, ...);
+        # either way it is rebuilt
+        pass
+
+    points = vertices if vertices is not None else POLYTOPE_GENERATORS[shape]()
+    points = points / np.linalg.norm(points, axis=1).max()
+    edges = neighbor_edges(points)
+    try:
+        os.makedirs(MESH_CACHE_DIR, exist_ok=True)
+        index_type = np.uint16 if len(points) <= 1 << 16 else np.int32
+        # written beside the cache file and renamed over it, so an
+        # interrupted write or a second launch never leaves a partial file
+        fd, tmp = tempfile.mkstemp(suffix=".npz", dir=MESH_CACHE_DIR)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, points=points.astype(np.float32), edges=edges.astype(index_type))
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError as e:
+        print(f"Warning: Could not cache mesh {key}: {e}")
+    return points.astype(np.float32), edges
+
+def rotation_planes(dims=DEFAULT_DIMENSIONS):
+    # the ring of neighbouring axes plus the skip-one planes, which for 5D
+    # gives the original xy, yz, zw, wv, vx, xz, yw
+    planes = [AXIS_NAMES[i] + AXIS_NAMES[(i + 1) % dims] for i in range(dims)]
+    planes += [AXIS_NAMES[i] + AXIS_NAMES[i + 2] for i in range(dims - 3)]
+    return planes
+
+def rotation_matrix(angles, dims=DEFAULT_DIMENSIONS):
+    # composes the plane rotations in the order of the angles dict, so
+    # rotation_matrix(angles) @ p matches applying them one by one
+    m = np.eye(dims)
+    for plane, angle in angles.items():
+        a, b = AXIS_INDEX[plane[0]], AXIS_INDEX[plane[1]]
         cos_a = math.cos(angle)
         sin_a = math.sin(angle)
-        return a*cos_a - b*sin_a, a*sin_a + b*cos_a
-    x,y = rotate(x,y,angles['xy'])
-    y,z = rotate(y,z,angles['yz'])
-    z,w = rotate(z,w,angles['zw'])
-    w,v = rotate(w,v,angles['wv'])
-    v,x = rotate(v,x,angles['vx'])
-    x,z = rotate(x,z,angles['xz'])
-    y,w = rotate(y,w,angles['yw'])
-    return [x,y,z,w,v]
-
-def project_5d_to_3d(point, distance=4):
-    x,y,z,w,v = point
-    factor = distance / (distance - v)
-    return [x*factor, y*factor, z*factor]
-
-def project_3d_to_2d(point, distance=5):
-    x,y,z = point
-    factor = distance / (distance - z)
-    return (x*factor, y*factor)
-
-motion_blur_surface = pygame.Surface((GAME_SIZE, GAME_SIZE))
-motion_blur_surface.set_alpha(40)
-motion_blur_surface.fill((0,0,0))
+        row_a = m[a].copy()
+        m[a] = row_a*cos_a - m[b]*sin_a
+        m[b] = row_a*sin_a + m[b]*cos_a
+    return m
+
+def rotation_matrices(angles, dims=DEFAULT_DIMENSIONS):
+    # rotation_matrix for many instances at once; angles is (n, planes) with
+    # columns in rotation_planes(dims) order
+    m = np.tile(np.eye(dims), (len(angles), 1, 1))
+    cos_a = np.cos(angles)
+    sin_a = np.sin(angles)
+    for k, plane in enumerate(rotation_planes(dims)):
+        a, b = AXIS_INDEX[plane[0]], AXIS_INDEX[plane[1]]
+        row_a = m[:, a].copy()
+        m[:, a] = row_a*cos_a[:, k, None] - m[:, b]*sin_a[:, k, None]
+        m[:, b] = row_a*sin_a[:, k, None] + m[:, b]*cos_a[:, k, None]
+    return m
+
+def rotate_points(points, angles, radius=1.0):
+    dims = points.shape[1]
+    return points @ (rotation_matrix(angles, dims).T * radius)
+
+def project_to_3d(points, distance=4):
+    # perspective divide by the last axis, the axes in between are dropped
+    if points.shape[1] == 3:
+        return points.astype(float)
+    factor = distance / (distance - points[:, -1])
+    return points[:, :3] * factor[:, None]
+
+def project_3d_to_2d(points, distance=5):
+    factor = distance / (distance - points[:, 2])
+    return points[:, :2] * factor[:, None]
+
+# a view keeps three axes for 3D and, unless orthographic, divides by the
+# last remaining axis like project_to_3d; the other axes are dropped
+VIEW_PRESETS = {
+    'perspective': {"keep": "xyz", "distance": 4, "distance_3d": 5},
+    'orthographic': {"keep": "xyz", "distance": None, "distance_3d": None},
+    'far': {"keep": "xyz", "distance": 8, "distance_3d": 10},
+    'drop-x': {"keep": "yzw", "distance": 4, "distance_3d": 5},
+    'drop-y': {"keep": "xzw", "distance": 4, "distance_3d": 5},
+    'drop-z': {"keep": "xyw", "distance": 4, "distance_3d": 5},
+}
+
+def view_matrix(view, dims=DEFAULT_DIMENSIONS):
+    # (dims, 3 or 4) matrix picking the kept axes, then the divide axis
+    axes = [AXIS_INDEX[axis] for axis in view["keep"]]
+    if max(axes) >= dims:
+        raise ValueError(f"needs the {view['keep']} axes, which a {dims}D shape does not have")
+    rest = [axis for axis in range(dims) if axis not in axes]
+    if view["distance"] is not None and rest:
+        axes.append(rest[-1])
+    return np.eye(dims)[:, axes]
+
+def project_view(rotated, matrix, view):
+    coords = rotated @ matrix
+    if view["distance"] is None:
+        return coords[:, :2]
+    if coords.shape[1] == 4:
+        coords = coords[:, :3] * (view["distance"] / (view["distance"] - coords[:, 3]))[:, None]
+    return coords[:, :2] * (view["distance_3d"] / (view["distance_3d"] - coords[:, 2]))[:, None]
+
+def edge_paths(edges, vertex_count):
+    # splits the edges into polylines so a frame is a few pygame.draw.lines
+    # calls rather than one call per edge. An edge joining two odd-degree
+    # vertices is walked twice, which for hypercubes leaves a single path.
+    adjacency = [[] for _ in range(vertex_count + 1)]
+    used = []
+
+    def add(a, b):
+        adjacency[a].append((b, len(used)))
+        adjacency[b].append((a, len(used)))
+        used.append(False)
+
+    edge_list = edges.tolist()
+    for a, b in edge_list:
+        add(a, b)
+    degree = np.bincount(edges.ravel(), minlength=vertex_count)
+    odd = set(np.flatnonzero(degree % 2).tolist())
+    for a, b in edge_list:
+        if a in odd and b in odd:
+            add(a, b)
+            odd.discard(a)
+            odd.discard(b)
+    # what is still odd hangs off a virtual vertex where the walk is cut
+    virtual = vertex_count
+    for v in odd:
+        add(v, virtual)
+
+    paths = []
+    for start in [virtual] + list(range(vertex_count)):
+        stack = [start]
+        circuit = []
+        while stack:
+            adj = adjacency[stack[-1]]
+            while adj and used[adj[-1][1]]:
+                adj.pop()
+            if adj:
+                w, idx = adj.pop()
+                used[idx] = True
+                stack.append(w)
+            else:
+                circuit.append(stack.pop())
+        path = []
+        for v in circuit + [virtual]:
+            if v != virtual:
+                path.append(v)
+            elif len(path) > 1:
+                paths.append(np.array(path, dtype=np.int32))
+                path = []
+            else:
+                path = []
+    return paths
+
+def path_segments(paths):
+    # the paths joined end to end: vertex order, and for each consecutive
+    # pair whether it is a real segment rather than a jump between paths
+    flat = np.concatenate(paths)
+    valid = np.ones(len(flat) - 1, dtype=bool)
+    valid[np.cumsum([len(path) for path in paths])[:-1] - 1] = False
+    return flat, valid
+
+# a culled segment shorter than this many pixels is cheaper to draw than
+# the extra draw call it takes to leave it out of its polyline
+CULL_SPLIT_LENGTH = 512
+
+def cull_segments(points_2d, flat, valid, size, radius=0, max_segments=None):
+    # screen-space culling on projected pixel positions, returning masks
+    # over the segments: the ones to draw, the zero-length ones (which can
+    # sit inside a polyline by dropping a point), the off-screen ones still
+    # submitted to bridge two drawn ones in a polyline, and the vertices
+    # left to draw, one per pixel and on screen. Repeats of a segment
+    # between the same two pixels are dropped when long enough to be worth
+    # it. At most max_segments are submitted, longest first, and under the
+    # cap nothing off screen is.
+    x = points_2d[:, 0].astype(np.int64)
+    y = points_2d[:, 1].astype(np.int64)
+    _, first, pixel = np.unique((x << 32) + y, return_index=True, return_inverse=True)
+    # Cohen-Sutherland outcodes: a segment is off screen when both ends
+    # share one
+    code = (x < 0) | (x >= size) << 1 | (y < 0) << 2 | (y >= size) << 3
+    a, b = flat[:-1], flat[1:]
+    off = valid & ((code[a] & code[b]) != 0)
+    zero = valid & ~off & (pixel[a] == pixel[b])
+    keep = valid & ~off & ~zero
+    delta = points_2d[a] - points_2d[b]
+    length = (delta * delta).sum(axis=1)
+
+    ids = np.flatnonzero(keep)
+    pa, pb = pixel[a[ids]], pixel[b[ids]]
+    key = np.minimum(pa, pb) * len(first) + np.maximum(pa, pb)
+    # any one of each run of equal keys will do, so a plain argsort is
+    # enough and much cheaper than np.unique's stable one
+    order = np.argsort(key)
+    key = key[order]
+    # (empty when nothing survived, as when the shape is all off screen)
+    repeats = ids[order[np.flatnonzero(key[1:] == key[:-1]) + 1]]
+    # pygame clips a line on its unrounded ends, so only repeats with both
+    # ends on screen are sure to draw the same pixels
+    repeats = repeats[(length[repeats] >= CULL_SPLIT_LENGTH ** 2) & (code[a[repeats]] | code[b[repeats]] == 0)]
+    keep[repeats] = False
+
+    # an off-screen segment only saves a draw call between two drawn ones
+    # in the same run; at either end of a run it is dropped. drawn counts
+    # kept segments so far, and its value at the breaks either side of a
+    # run bounds the kept ones before and after each segment in it.
+    run = keep | zero | off
+    drawn = np.cumsum(keep)
+    breaks = np.where(run, 0, drawn)
+    before = drawn - keep - np.maximum.accumulate(breaks)
+    after = np.minimum.accumulate(np.where(run, drawn[-1:], drawn)[::-1])[::-1] - drawn
+    off &= (before > 0) & (after > 0)
+    if max_segments is not None and keep.sum() + off.sum() > max_segments:
+        off[:] = False
+        if keep.sum() > max_segments:
+            ids = np.flatnonzero(keep)
+            keep[ids[np.argpartition(-length[ids], max_segments)[max_segments:]]] = False
+
+    px, py = x[first], y[first]
+    dots = first[(px > -radius) & (px < size + radius) & (py > -radius) & (py < size + radius)]
+    return keep, zero, off, dots
+
+_dot_sprites = OrderedDict()
+
+def dot_sprite(color, radius, antialias=False):
+    # pre-rendered vertex dot, cached per color so a frame of vertices is
+    # one blits() call
+    key = (tuple(color), radius, antialias)
+    sprite = _dot_sprites.get(key)
+    if sprite is None:
+        size = 2 * radius + 1
+        if antialias:
+            sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.gfxdraw.aacircle(sprite, radius, radius, radius, key[0])
+            pygame.gfxdraw.filled_circle(sprite, radius, radius, radius, key[0])
+        else:
+            sprite = pygame.Surface((size, size))
+            sprite.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+            pygame.draw.circle(sprite, key[0], (radius, radius), radius)
+        _dot_sprites[key] = sprite
+        # room for every palette at the few radii an instance field uses
+        if len(_dot_sprites) > 256:
+            _dot_sprites.popitem(last=False)
+    else:
+        _dot_sprites.move_to_end(key)
+    return sprite
 
 def rainbow_color(t, speed=0.002):
     hue = (t * speed) % 1.0
@@ -170,6 +670,971 @@ def color_shift_palette(base_palette, t, speed=0.01):
         shifted.append((int(r2*255), int(g2*255), int(b2*255)))
     return shifted
 
+# the animated palettes advance 0.01 of a hue turn per frame, so they repeat
+# every 100 frames and can be tabulated once
+PALETTE_ANIMATION_FRAMES = 100
+RAINBOW_PALETTE_IDX = 1
+
+# "Ocean Shift" animates the palette whose name starts with "Ocean"
+SHIFT_BASE_INDEX = {}
+for idx, name in enumerate(PALETTE_NAMES[:len(ALL_PALETTES)]):
+    if name.endswith(" Shift"):
+        prefix = name[:-len(" Shift")]
+        for base_idx, base_name in enumerate(PALETTE_NAMES[:20]):
+            if base_name.split()[0] == prefix:
+                SHIFT_BASE_INDEX[idx] = base_idx % len(fixed_palettes)
+                break
+
+_animation_tables = {}
+
+def palette_animation_table(idx):
+    # (frames, 3, 3) uint8 color table for an animated palette index, None
+    # for static palettes; built on first use
+    if idx == RAINBOW_PALETTE_IDX:
+        key = 'rainbow'
+    elif idx in SHIFT_BASE_INDEX:
+        key = SHIFT_BASE_INDEX[idx]
+    else:
+        return None
+    table = _animation_tables.get(key)
+    if table is None:
+        table = np.empty((PALETTE_ANIMATION_FRAMES, 3, 3), dtype=np.uint8)
+        for t in range(PALETTE_ANIMATION_FRAMES):
+            if key == 'rainbow':
+                table[t] = [rainbow_color(t + offset, speed=0.01) for offset in (0, 85, 170)]
+            else:
+                table[t] = color_shift_palette(fixed_palettes[key], t, speed=0.01)
+        _animation_tables[key] = table
+    return table
+
+# chaos mode redraws its rotation speeds and colors every simulation tick
+CHAOS_SPEED = 0.1
+CHAOS_BLOCK = 256
+# seeds go to numpy's generators and into input traces as a u32
+MAX_SEED = 2**32 - 1
+
+def seed_arg(value):
+    # argparse type for --seed
+    seed = int(value)
+    if not 0 <= seed <= MAX_SEED:
+        raise argparse.ArgumentTypeError(f"seed must be 0 to {MAX_SEED}")
+    return seed
+
+class ChaosEngine:
+    # chaos rotation speeds and colors as seeded random streams, generated
+    # CHAOS_BLOCK ticks at a time so a frame only indexes into them. Each
+    # block is seeded from (seed, block number), so any tick can be looked up
+    # directly and the same seed replays the same chaos.
+    def __init__(self, axes, seed=None, block=CHAOS_BLOCK):
+        self.axes = list(axes)
+        self.seed = random.randrange(MAX_SEED + 1) if seed is None else seed
+        self.block = block
+        self.block_idx = None
+
+    def fill(self, block_idx):
+        rng = np.random.default_rng([self.seed, block_idx])
+        self.speeds = rng.uniform(-CHAOS_SPEED, CHAOS_SPEED, (self.block, len(self.axes))).tolist()
+        self.colors = rng.integers(0, 256, (self.block, 3, 3)).tolist()
+        self.block_idx = block_idx
+
+    def at(self, tick):
+        block_idx, i = divmod(tick, self.block)
+        if block_idx != self.block_idx:
+            self.fill(block_idx)
+        return self.speeds[i], self.colors[i]
+
+    def speeds_at(self, tick):
+        return zip(self.axes, self.at(tick)[0])
+
+    def colors_at(self, tick):
+        return self.at(tick)[1]
+
+class InstanceField:
+    # many copies of one polytope, each with its own rotation speeds,
+    # position, scale and palette, kept in flat arrays so that a frame is a
+    # few batched numpy operations plus one draw call per visible instance
+    def __init__(self, points, paths, count, radius=1.0, seed=None):
+        rng = np.random.default_rng(seed)
+        dims = points.shape[1]
+        planes = len(rotation_planes(dims))
+        self.points = points * radius
+        self.paths = paths
+        self.count = count
+        self.phase = rng.uniform(0, 2 * math.pi, (count, planes))
+        self.speeds = rng.uniform(0.005, 0.02, (count, planes)) * rng.choice((-1, 1), (count, planes))
+        # design-space pixels, like the single cube's 150 px scale
+        self.centers = rng.uniform(0, GAME_SIZE, (count, 2))
+        self.scales = 150 / math.sqrt(count) * rng.uniform(0.5, 1.2, count)
+        self.palettes = np.array(fixed_palettes, dtype=np.uint8)[rng.integers(0, len(fixed_palettes), count)]
+        self.visible = 0
+
+    def project(self, t, ui_scale):
+        # (count, vertices, 2) screen positions at simulation time t
+        rotated = self.points @ rotation_matrices(self.phase + self.speeds * t, self.points.shape[1]).transpose(0, 2, 1)
+        count, vertices, dims = rotated.shape
+        flat = project_3d_to_2d(project_to_3d(rotated.reshape(-1, dims)))
+        return (flat.reshape(count, vertices, 2) * self.scales[:, None, None] + self.centers[:, None, :]) * ui_scale
+
+    def draw(self, surface, t, ui_scale):
+        points_2d = self.project(t, ui_scale)
+        width, height = surface.get_size()
+        lo = points_2d.min(axis=1)
+        hi = points_2d.max(axis=1)
+        visible = np.flatnonzero((hi[:, 0] >= 0) & (hi[:, 1] >= 0) & (lo[:, 0] < width) & (lo[:, 1] < height))
+        self.visible = len(visible)
+        if not self.visible:
+            return
+        points_2d = np.rint(points_2d[visible]).astype(np.int32)
+        palettes = self.palettes[visible]
+
+        edge_colors = palettes[:, 1].tolist()
+        for path in self.paths:
+            for line, color in zip(points_2d[:, path].tolist(), edge_colors):
+                pygame.draw.lines(surface, color, False, line)
+
+        # instances too small for a dot are drawn as edges only
+        radii = np.rint(5 * ui_scale * self.scales[visible] / 150).astype(int)
+        dotted = np.flatnonzero(radii >= 1)
+        corners = (points_2d[dotted] - radii[dotted, None, None]).tolist()
+        for i, corner in zip(dotted.tolist(), corners):
+            sprite = dot_sprite(palettes[i, 0].tolist(), int(radii[i]))
+            surface.blits(zip(itertools.repeat(sprite), corner), False)
+
+class ViewGrid:
+    # several projections of one rotated vertex array, each drawn into a
+    # grid tile that is a subsurface of the canvas
+    def __init__(self, names, dims):
+        self.names = names
+        self.views = [VIEW_PRESETS[name] for name in names]
+        self.matrices = [view_matrix(view, dims) for view in self.views]
+        self.cols = math.ceil(math.sqrt(len(names)))
+        self.rows = math.ceil(len(names) / self.cols)
+        self.surface = None
+        self.tiles = []
+
+    def layout(self, surface):
+        # (subsurface, rect) per view, rebuilt only when the canvas changes
+        if surface is not self.surface or surface.get_size() != self.size:
+            self.surface = surface
+            self.size = surface.get_size()
+            side = min(self.size[0] // self.cols, self.size[1] // self.rows)
+            left = (self.size[0] - side * self.cols) // 2
+            top = (self.size[1] - side * self.rows) // 2
+            self.tiles = []
+            for i in range(len(self.views)):
+                row, col = divmod(i, self.cols)
+                rect = pygame.Rect(left + col * side, top + row * side, side, side)
+                self.tiles.append((surface.subsurface(rect), rect))
+        return self.tiles
+
+BLOOM_SCALE = 0.125
+BLOOM_RADIUS = 2
+BLOOM_THRESHOLD = 24
+BLOOM_INTENSITY = 1.5
+BLOOM_LEVELS = 3
+
+def binomial_blur(a, b, radius):
+    # sums neighbours along axis 0 2*radius times, alternating direction so
+    # it stays centred: a binomial filter of width 2*radius+1 with one add
+    # per pass. Ends back in a, scaled by 4**radius; edges repeat.
+    for _ in range(radius):
+        np.add(a[1:], a[:-1], out=b[1:])
+        np.add(a[0], a[0], out=b[0])
+        np.add(b[:-1], b[1:], out=a[:-1])
+        np.add(b[-1], b[-1], out=a[-1])
+
+class Bloom:
+    # glow around the bright parts of a frame. The canvas is smoothscaled to
+    # a small surface, thresholded and halved into a mip chain; each level is
+    # blurred along both axes and added into the level above, and the
+    # result is upscaled and added onto the output. All buffers are made in
+    # resize, so a frame allocates no pixel memory.
+    # smoothscale dominates the cost, so the glow is smoothed up to half the
+    # output size and doubled from there; the glow hides the 2px blocks.
+    def __init__(self, scale=BLOOM_SCALE, radius=BLOOM_RADIUS, threshold=BLOOM_THRESHOLD,
+                 intensity=BLOOM_INTENSITY, levels=BLOOM_LEVELS):
+        self.scale = scale
+        self.radius = radius
+        self.threshold = threshold
+        self.intensity = intensity
+        self.levels = levels
+        self.key = None
+
+    def resize(self, canvas, output):
+        # the base level is a multiple of 2**(levels-1) so each halves exactly
+        step = 2 ** (self.levels - 1)
+        side = max(step * 4, round(canvas * self.scale) // step * step)
+        if self.key == (side, output):
+            return
+        self.key = (side, output)
+        self.small = pygame.Surface((side, side))
+        self.glow_small = pygame.Surface((side, side))
+        self.glow_half = pygame.Surface((max(1, output[0] // 2), max(1, output[1] // 2)))
+        self.glow = pygame.Surface(output)
+        self.mips = []
+        for level in range(self.levels):
+            n = side >> level
+            self.mips.append((np.zeros((n, n, 3), np.float32), np.zeros((n, n, 3), np.float32)))
+
+    def blur(self, level):
+        a, b = self.mips[level]
+        binomial_blur(a, b, self.radius)
+        binomial_blur(a.swapaxes(0, 1), b.swapaxes(0, 1), self.radius)
+        a *= 0.0625 ** self.radius
+
+    def render(self, surface):
+        pygame.transform.smoothscale(surface, self.small.get_size(), self.small)
+        base = self.mips[0][0]
+        pixels = pygame.surfarray.pixels3d(self.small)
+        np.subtract(pixels, self.threshold, out=base, dtype=np.float32)
+        del pixels
+        np.maximum(base, 0, out=base)
+
+        for level in range(1, self.levels):
+            parent, child = self.mips[level - 1][0], self.mips[level][0]
+            np.add(parent[0::2, 0::2], parent[1::2, 0::2], out=child)
+            child += parent[0::2, 1::2]
+            child += parent[1::2, 1::2]
+            child *= 0.25
+        # coarsest first, so each level's blur also smooths the blocky
+        # upsampled levels added into it
+        for level in range(self.levels - 1, 0, -1):
+            self.blur(level)
+            parent, child = self.mips[level - 1][0], self.mips[level][0]
+            for dx in (0, 1):
+                for dy in (0, 1):
+                    parent[dx::2, dy::2] += child
+        self.blur(0)
+
+        np.multiply(base, self.intensity, out=base)
+        np.minimum(base, 255, out=base)
+        pixels = pygame.surfarray.pixels3d(self.glow_small)
+        np.copyto(pixels, base, casting='unsafe')
+        del pixels
+
+    def apply(self, target):
+        pygame.transform.smoothscale(self.glow_small, self.glow_half.get_size(), self.glow_half)
+        pygame.transform.scale(self.glow_half, self.glow.get_size(), self.glow)
+        target.blit(self.glow, (0, 0), special_flags=pygame.BLEND_RGB_ADD)
+
+class TextCache:
+    # LRU of rendered text surfaces keyed by (font, text, color)
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surf = self.surfaces.get(key)
+        if surf is None:
+            surf = font.render(text, True, color)
+            self.surfaces[key] = surf
+            if len(self.surfaces) > self.max_entries:
+                self.surfaces.popitem(last=False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surf
+
+text_cache = TextCache()
+
+HUD_LINES = [
+    "WASD/QE: Rotate (manual)",
+    "SPACE: Cycle palette in set",
+    "B: Toggle motion blur",
+    "T: Switch blur style",
+    "ESC: Return to menu",
+    "SHIFT+M: Toggle keybind menu",
+    "SHIFT+P: Toggle palette menu",
+    "C: Toggle Chaos Mode",
+    "F11: Toggle fullscreen",
+    "L: Toggle anti-aliasing",
+    "G: Toggle glow",
+    "F3: Toggle profiler",
+    "F4: Toggle adaptive quality",
+    "F9: Toggle recording",
+]
+HUD_COLOR = (180, 180, 180)
+
+PROFILE_STAGES = ["events", "blur", "update", "geometry", "cull", "draw", "bloom", "hud", "scale", "record", "flip", "wait"]
+
+class FrameProfiler:
+    # per-stage frame timings in a fixed-size ring buffer; while disabled
+    # every call returns straight away
+    def __init__(self, capacity=600):
+        self.enabled = False
+        self.active = False
+        self.show_overlay = False
+        self.samples = np.zeros((capacity, len(PROFILE_STAGES)))
+        self.count = 0
+        self.stage_index = {stage: i for i, stage in enumerate(PROFILE_STAGES)}
+        self.row = [0.0] * len(PROFILE_STAGES)
+        self.last = 0.0
+        self.csv_file = None
+        self.csv_writer = None
+        self.panel = None
+        self.ui_scale = 1.0
+        self.tier = 0
+        self.culled = None
+
+    def open_csv(self, path):
+        self.csv_file = open(path, "w", newline="")
+        self.csv_writer = csv.writer(self.csv_file)
+        self.csv_writer.writerow(["frame"] + [f"{stage}_ms" for stage in PROFILE_STAGES] + ["total_ms", "quality_tier", "culled_segments", "clipped_segments", "culled_vertices"])
+        self.enabled = True
+
+    def close(self):
+        if self.csv_file is not None:
+            self.csv_file.close()
+            self.csv_file = None
+            self.csv_writer = None
+
+    def toggle_overlay(self):
+        self.show_overlay = not self.show_overlay
+        self.enabled = self.show_overlay or self.csv_writer is not None
+
+    def begin_frame(self):
+        # enabling takes effect here so a frame is never half recorded
+        self.active = self.enabled
+        if not self.active:
+            return
+        self.row = [0.0] * len(PROFILE_STAGES)
+        self.last = time.perf_counter()
+
+    def mark(self, stage):
+        if not self.active:
+            return
+        now = time.perf_counter()
+        self.row[self.stage_index[stage]] += now - self.last
+        self.last = now
+
+    def end_frame(self, frame, tier=0, culled=None):
+        # culled is (segments culled, segments, off-screen segments still
+        # drawn for pygame to clip, vertices culled, vertices)
+        if not self.active:
+            return
+        row_ms = [t * 1000 for t in self.row]
+        self.samples[self.count % len(self.samples)] = row_ms
+        self.count += 1
+        self.tier = tier
+        self.culled = culled
+        if self.csv_writer is not None:
+            self.csv_writer.writerow([frame] + [f"{t:.3f}" for t in row_ms] + [f"{sum(row_ms):.3f}", tier]
+                                     + (["", "", ""] if culled is None else [culled[0], culled[2], culled[3]]))
+
+    def recent(self, frames=120):
+        n = min(self.count, frames, len(self.samples))
+        idx = (self.count - n + np.arange(n)) % len(self.samples)
+        return self.samples[idx]
+
+    def build_panel(self):
+        recent = self.recent()
+        k = self.ui_scale
+        width, bar_height, margin = round(250 * k), round(60 * k), round(8 * k)
+        lines = [f"{'stage':<9}{'mean':>7}{'max':>7}"]
+        if len(recent):
+            means = recent.mean(axis=0)
+            peaks = recent.max(axis=0)
+            lines += [f"{stage:<9}{means[i]:>7.2f}{peaks[i]:>7.2f}" for i, stage in enumerate(PROFILE_STAGES)]
+            totals = recent.sum(axis=1)
+            lines.append(f"{'frame':<9}{totals.mean():>7.2f}{totals.max():>7.2f}")
+        lines.append(f"{'quality':<9}{QUALITY_TIERS[self.tier]['name']:>14}")
+        if self.culled is not None:
+            lines.append(f"{'culled':<9}{self.culled[0]:>6}/{self.culled[1]:<7}segs")
+            lines.append(f"{'clipped':<9}{self.culled[2]:>6}{'':<8}segs")
+            lines.append(f"{'':<9}{self.culled[3]:>6}/{self.culled[4]:<7}dots")
+        line_height = small_font.get_linesize()
+        height = line_height * len(lines) + bar_height + 4 * margin
+        if self.panel is None or self.panel.get_height() != height:
+            self.panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.panel.fill((0, 0, 0, 170))
+        for i, line in enumerate(lines):
+            self.panel.blit(text_cache.render(small_font, line, HUD_COLOR), (margin, margin + i * line_height))
+
+        # frame-time histogram, 2 ms bins up to 40 ms with the last bin open
+        if len(recent):
+            counts = np.bincount(np.minimum(totals // 2, 19).astype(int), minlength=20)
+            bar_w = (width - 2 * margin) // 20
+            top = height - bar_height - margin
+            for i, count in enumerate(counts):
+                h = int(bar_height * count / counts.max())
+                color = (80, 200, 80) if i < 8 else (220, 180, 60) if i < 16 else (220, 60, 60)
+                pygame.draw.rect(self.panel, color, (margin + i * bar_w, top + bar_height - h, bar_w - 1, h))
+            # 60 fps budget
+            x = margin + int(16.7 / 2 * bar_w)
+            pygame.draw.line(self.panel, (255, 255, 255), (x, top), (x, top + bar_height))
+
+    def draw_overlay(self, surface, frame):
+        if not self.show_overlay:
+            return
+        # the numbers are refreshed a few times a second so they stay readable
+        if self.panel is None or frame % 15 == 0:
+            self.build_panel()
+        k = self.ui_scale
+        surface.blit(self.panel, (surface.get_width() - self.panel.get_width() - round(10 * k), round(80 * k)))
+
+# from best to cheapest; each tier gives up one more thing. render_scale
+# multiplies the --render-scale setting, and the rest only ever turn the
+# user's choices down, never on
+QUALITY_TIERS = [
+    {"name": "full", "antialias": True, "screen_blur": True, "render_scale": 1.0, "hud": True, "edge_lod": False, "bloom": True},
+    {"name": "no-aa", "antialias": False, "screen_blur": True, "render_scale": 1.0, "hud": True, "edge_lod": False, "bloom": True},
+    {"name": "trails", "antialias": False, "screen_blur": False, "render_scale": 1.0, "hud": True, "edge_lod": False, "bloom": False},
+    {"name": "scale-75", "antialias": False, "screen_blur": False, "render_scale": 0.75, "hud": True, "edge_lod": False, "bloom": False},
+    {"name": "no-hud", "antialias": False, "screen_blur": False, "render_scale": 0.75, "hud": False, "edge_lod": False, "bloom": False},
+    {"name": "lod", "antialias": False, "screen_blur": False, "render_scale": 0.5, "hud": False, "edge_lod": True, "bloom": False},
+]
+# shapes with more edges than this drop half of them and their vertex dots
+# at the lod tier
+LOD_MIN_EDGES = 256
+
+class QualityGovernor:
+    # steps QUALITY_TIERS down when the busy part of recent frames runs over
+    # the target, and back up only after a longer stretch well under it
+    def __init__(self, target_ms=1000 / 60, window=30, recover_window=120):
+        self.enabled = False
+        self.target_ms = target_ms
+        self.window = window
+        self.samples = np.zeros(recover_window)
+        self.count = 0
+        self.tier = 0
+
+    @property
+    def settings(self):
+        return QUALITY_TIERS[self.tier]
+
+    def reset(self):
+        self.count = 0
+        self.tier = 0
+
+    def record(self, busy_ms):
+        # returns True when the tier changed
+        if not self.enabled:
+            return False
+        self.samples[self.count % len(self.samples)] = busy_ms
+        self.count += 1
+        if self.count >= self.window and self.tier < len(QUALITY_TIERS) - 1:
+            recent = self.samples[(self.count - self.window + np.arange(self.window)) % len(self.samples)]
+            if recent.mean() > self.target_ms:
+                self.tier += 1
+                self.count = 0
+                return True
+        if self.count >= len(self.samples) and self.tier > 0:
+            if self.samples.mean() < self.target_ms * 0.6:
+                self.tier -= 1
+                self.count = 0
+                return True
+        return False
+
+RECORD_FORMATS = ['png', 'gif', 'raw']
+# Pillow only writes a GIF once it has every quantized frame, at a byte a
+# pixel, so a GIF recording stops by itself once its frames reach this
+GIF_MAX_BYTES = 256 << 20
+
+def encode_frames(fmt, path, size, block_names, filled, free, ready):
+    # encoder process: frames arrive as (slot, index, timestamp) in shared
+    # memory blocks, and each slot is handed back once it has been written
+    blocks = [shared_memory.SharedMemory(name=name) for name in block_names]
+    frames = [pygame.image.frombuffer(block.buf, size, 'RGBX') for block in blocks]
+    out = None
+    gif_frames = []
+    gif_times = []
+    if fmt == 'raw':
+        out = open(path, 'wb')
+    elif fmt == 'gif':
+        from PIL import Image
+    ready.set()
+    while True:
+        item = filled.get()
+        if item is None:
+            break
+        slot, index, stamp = item
+        if fmt == 'png':
+            pygame.image.save(frames[slot], os.path.join(path, f"frame_{index:05d}.png"))
+        elif fmt == 'raw':
+            out.write(pygame.image.tobytes(frames[slot], 'RGB'))
+        else:
+            image = Image.frombytes('RGB', size, pygame.image.tobytes(frames[slot], 'RGB'))
+            gif_frames.append(image.quantize())
+            gif_times.append(stamp)
+        free.put(slot)
+
+    if out is not None:
+        out.close()
+    if gif_frames:
+        # gif delays are in whole centiseconds; 20 ms is the shortest most viewers honor
+        durations = [max(20, round((b - a) * 100) * 10) for a, b in zip(gif_times, gif_times[1:])]
+        durations.append(durations[-1] if durations else 20)
+        gif_frames[0].save(path, save_all=True, append_images=gif_frames[1:], duration=durations, loop=0)
+    del frames
+    for block in blocks:
+        block.close()
+
+class FrameRecorder:
+    # copies presented frames into a fixed pool of shared memory buffers that
+    # a separate process encodes; when every buffer is still queued the frame
+    # is dropped rather than making the render loop wait
+    def __init__(self, fmt='png', directory='recordings', scale=1.0, buffers=8):
+        self.fmt = fmt
+        self.directory = directory
+        self.scale = scale
+        self.buffers = buffers
+        self.recording = False
+        self.processes = []
+        self.max_frames = None
+
+    def start(self, source_size):
+        if self.fmt == 'gif':
+            try:
+                import PIL
+            except ImportError:
+                print("GIF recording needs Pillow (pip install pillow)")
+                return False
+        os.makedirs(self.directory, exist_ok=True)
+        name = time.strftime("tesseract_%Y%m%d_%H%M%S")
+        self.size = (max(1, round(source_size[0] * self.scale)), max(1, round(source_size[1] * self.scale)))
+        if self.fmt == 'png':
+            self.path = os.path.join(self.directory, name)
+            os.makedirs(self.path, exist_ok=True)
+        elif self.fmt == 'gif':
+            self.path = os.path.join(self.directory, name + ".gif")
+        else:
+            self.path = os.path.join(self.directory, f"{name}_{self.size[0]}x{self.size[1]}.rgb")
+
+        width, height = self.size
+        self.max_frames = max(1, GIF_MAX_BYTES // (width * height)) if self.fmt == 'gif' else None
+        self.blocks = [shared_memory.SharedMemory(create=True, size=width * height * 4) for _ in range(self.buffers)]
+        self.frames = [pygame.image.frombuffer(block.buf, self.size, 'RGBX') for block in self.blocks]
+        self.scaled = None
+        ctx = multiprocessing.get_context("spawn")
+        self.filled = ctx.Queue()
+        self.free = ctx.Queue()
+        for slot in range(self.buffers):
+            self.free.put(slot)
+        self.ready = ctx.Event()
+        # png frames are independent files, so they can be encoded in parallel
+        workers = max(1, min(4, (os.cpu_count() or 1) - 1)) if self.fmt == 'png' else 1
+        self.processes = [ctx.Process(target=encode_frames, daemon=True,
+                                      args=(self.fmt, self.path, self.size, [b.name for b in self.blocks],
+                                            self.filled, self.free, self.ready))
+                          for _ in range(workers)]
+        for process in self.processes:
+            process.start()
+        self.captured = 0
+        self.dropped = 0
+        self.started = time.perf_counter()
+        self.recording = True
+        return True
+
+    def capture(self, surface):
+        # frames presented while the encoder is still starting up are skipped
+        if not self.recording or not self.ready.is_set() or self.full():
+            return
+        try:
+            slot = self.free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return
+        frame = self.frames[slot]
+        if surface.get_size() == self.size:
+            frame.blit(surface, (0, 0))
+        else:
+            if self.scaled is None or self.scaled.get_bitsize() != surface.get_bitsize():
+                self.scaled = pygame.Surface(self.size, 0, surface)
+            pygame.transform.scale(surface, self.size, self.scaled)
+            frame.blit(self.scaled, (0, 0))
+        self.filled.put((slot, self.captured, time.perf_counter()))
+        self.captured += 1
+
+    def full(self):
+        return self.recording and self.max_frames is not None and self.captured >= self.max_frames
+
+    def status(self):
+        limit = "" if self.max_frames is None else f"/{self.max_frames}"
+        return f"REC {self.captured}{limit} frames, {self.dropped} dropped"
+
+    def stop(self):
+        if not self.recording:
+            return
+        self.recording = False
+        # the encoders drain what is already queued before they exit
+        for process in self.processes:
+            self.filled.put(None)
+        for process in self.processes:
+            process.join()
+        self.processes = []
+        del self.frames
+        self.scaled = None
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+        elapsed = time.perf_counter() - self.started
+        print(f"Recorded {self.captured} frames in {elapsed:.1f}s to {self.path} "
+              f"({self.dropped} dropped, {self.size[0]}x{self.size[1]})")
+
+CONTROL_PORT = 7770
+# a burst of remote commands is spread over frames rather than run at once
+MAX_COMMANDS_PER_FRAME = 32
+CONTROL_STATES = {'visualization': 0, 'menu': 1, 'palette': 2, 'keybinds': 3}
+
+def parse_command(line, planes):
+    # one text command to a tuple for TesseractApp.apply_command; raises
+    # ValueError with a message for the client
+    words = line.split()
+    if not words:
+        raise ValueError("empty command")
+    name, args = words[0].lower(), [w.lower() for w in words[1:]]
+    if name == 'palette' and len(args) == 1:
+        if args[0] == 'next':
+            return (name, 'next')
+        if args[0].isdigit() and 1 <= int(args[0]) <= len(ALL_PALETTES):
+            return (name, int(args[0]) - 1)
+        raise ValueError(f"palette takes next or 1 to {len(ALL_PALETTES)}")
+    if name == 'chaos' and len(args) == 1 and args[0] in ('on', 'off', 'toggle'):
+        return (name, args[0])
+    if name == 'speed' and len(args) == 2:
+        if args[0] != 'all' and args[0] not in planes:
+            raise ValueError(f"speed takes all or a plane: {' '.join(planes)}")
+        try:
+            value = float(args[1])
+        except ValueError:
+            raise ValueError("speed value must be a number")
+        if not -0.2 <= value <= 0.2:
+            raise ValueError("speed value must be between -0.2 and 0.2")
+        return (name, args[0], value)
+    if name == 'state' and len(args) == 1 and args[0] in CONTROL_STATES:
+        return (name, CONTROL_STATES[args[0]])
+    if name == 'blur' and len(args) == 1 and args[0] in ['on', 'off'] + BLUR_STYLES:
+        return (name, args[0])
+    if name == 'quit' and not args:
+        return (name,)
+    raise ValueError(f"unknown command {line.strip()!r}")
+
+class ControlProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.transport.sendto(self.server.handle(data.decode(errors='replace')).encode(), addr)
+
+class ControlServer:
+    # text commands over UDP on localhost, one per line, parsed on an
+    # asyncio loop in a background thread. Parsed commands reach the render
+    # loop through a deque, whose append and popleft are atomic, so neither
+    # side ever waits on the other.
+    def __init__(self, planes, port=CONTROL_PORT, host="127.0.0.1", backlog=1024):
+        self.planes = list(planes)
+        self.address = (host, port)
+        self.commands = deque(maxlen=backlog)
+        self.wake_pending = False
+        self.loop = None
+        self.thread = None
+        self.error = None
+
+    def start(self):
+        # an idle menu sleeps in pygame.event.wait, so commands post this
+        # event to wake it
+        self.wake_event = pygame.event.custom_type()
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self.serve, args=(ready,), daemon=True)
+        self.thread.start()
+        ready.wait()
+        if self.error is not None:
+            raise self.error
+
+    def serve(self, ready):
+        self.loop = asyncio.new_event_loop()
+        try:
+            transport, _ = self.loop.run_until_complete(
+                self.loop.create_datagram_endpoint(lambda: ControlProtocol(self), local_addr=self.address))
+        except OSError as e:
+            self.error = e
+            self.loop.close()
+            ready.set()
+            return
+        ready.set()
+        self.loop.run_forever()
+        transport.close()
+        self.loop.close()
+
+    def handle(self, text):
+        replies = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            if line.strip().lower() == 'ping':
+                replies.append("pong")
+                continue
+            try:
+                command = parse_command(line, self.planes)
+            except ValueError as e:
+                replies.append(f"error: {e}")
+                continue
+            # a full deque would evict a command already answered ok. This
+            # thread is the only one appending, so the check can't go stale.
+            if len(self.commands) == self.commands.maxlen:
+                replies.append("error: queue full, try again")
+            else:
+                self.commands.append(command)
+                replies.append("ok")
+        if self.commands and not self.wake_pending:
+            self.wake_pending = True
+            pygame.event.post(pygame.event.Event(self.wake_event))
+        return "\n".join(replies)
+
+    def drain(self, limit=MAX_COMMANDS_PER_FRAME):
+        self.wake_pending = False
+        for _ in range(min(limit, len(self.commands))):
+            yield self.commands.popleft()
+
+    def stop(self):
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+
+# key bindings, one per line: state (a CONTROL_STATES name, or any), key
+# with an optional shift+ prefix (pygame key names), action, and the
+# action's argument if it takes one. A --keymap file uses the same format
+# and overrides these line by line; the action none removes a binding.
+DEFAULT_KEYMAP = """
+any            f11       fullscreen
+menu           up        menu_move        -1
+menu           down      menu_move        1
+menu           left      menu_adjust      -1
+menu           right     menu_adjust      1
+menu           return    menu_select
+palette        left      palette_step     -1
+palette        right     palette_step     1
+palette        shift+p   show             visualization
+palette        escape    show             menu
+keybinds       shift+m   show             visualization
+keybinds       escape    show             menu
+visualization  escape    exit_to_menu
+visualization  space     next_palette
+visualization  b         toggle_blur
+visualization  t         next_blur_style
+visualization  l         toggle_antialias
+visualization  shift+m   show             keybinds
+visualization  shift+p   show             palette
+visualization  c         chaos
+visualization  f4        governor
+visualization  g         bloom
+visualization  f9        record
+visualization  f3        profiler
+""" + "".join(f"menu           shift+{key}   palette_set      {n}\n"
+              f"visualization  shift+{key}   palette_set      {n}\n"
+              f"palette        {key}         palette          {n}\n"
+              for n, key in enumerate("1234567890", 1))
+# what each action's argument is: a -1/1 step, a 1-10 number or a state
+KEY_ACTIONS = {
+    'fullscreen': None, 'exit_to_menu': None, 'next_palette': None, 'toggle_blur': None,
+    'next_blur_style': None, 'toggle_antialias': None, 'chaos': None, 'governor': None,
+    'bloom': None, 'record': None, 'profiler': None, 'menu_select': None,
+    'menu_move': 'step', 'menu_adjust': 'step', 'palette_step': 'step',
+    'palette_set': 'number', 'palette': 'number', 'show': 'state', 'none': None,
+}
+
+def parse_keymap(text, bindings=None):
+    # keymap lines into {(state, key, shift): (action, argument)}, added to
+    # and overriding bindings; raises ValueError naming the bad line
+    bindings = {} if bindings is None else bindings
+    for number, line in enumerate(text.splitlines(), 1):
+        words = line.split("#")[0].split()
+        if not words:
+            continue
+        try:
+            if len(words) not in (3, 4):
+                raise ValueError("expected: state key action [argument]")
+            state, key, action = (w.lower() for w in words[:3])
+            if state != 'any' and state not in CONTROL_STATES:
+                raise ValueError(f"unknown state {state!r}")
+            shift = key.startswith("shift+")
+            code = pygame.key.key_code(key[6:] if shift else key)
+            if action not in KEY_ACTIONS:
+                raise ValueError(f"unknown action {action!r}")
+            kind = KEY_ACTIONS[action]
+            if (kind is None) != (len(words) == 3):
+                raise ValueError(f"{action} takes {'no' if kind is None else 'one'} argument")
+            arg = None
+            if kind == 'step':
+                arg = int(words[3])
+                if arg not in (-1, 1):
+                    raise ValueError("step must be -1 or 1")
+            elif kind == 'number':
+                arg = int(words[3]) - 1
+                if not 0 <= arg < 10:
+                    raise ValueError("number must be 1 to 10")
+            elif kind == 'state':
+                if words[3].lower() not in CONTROL_STATES:
+                    raise ValueError(f"unknown state {words[3]!r}")
+                arg = CONTROL_STATES[words[3].lower()]
+        except ValueError as e:
+            raise ValueError(f"keymap line {number}: {e}")
+        for idx in CONTROL_STATES.values() if state == 'any' else [CONTROL_STATES[state]]:
+            if action == 'none':
+                bindings.pop((idx, code, shift), None)
+            else:
+                bindings[(idx, code, shift)] = (action, arg)
+    return bindings
+
+# memory-mapped ring of per-frame geometry for external consumers. The
+# header is GEOMETRY_HEADER at offset 0, then the int32 edge list, then
+# `slots` fixed-size slots of seq u64, frame u64, tick u64, 9 palette bytes
+# (vertex, edge, spare RGB) padded to 40 bytes, and float32 x, y per vertex
+# in GAME_SIZE design-space pixels. A slot's seq is odd while it is being
+# written, so a reader that sees the same even seq before and after copying
+# got a whole frame.
+GEOMETRY_MAGIC = b"TSRG"
+GEOMETRY_VERSION = 1
+GEOMETRY_HEADER = struct.Struct("<4sIIIIIIII")
+GEOMETRY_LATEST_OFFSET = 40
+GEOMETRY_SLOT_HEADER = 40
+GEOMETRY_SLOT = struct.Struct("<QQQ9B")
+GEOMETRY_SEQ = struct.Struct("<Q")
+GEOMETRY_SLOTS = 8
+DEFAULT_GEOMETRY_PATH = os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+                                     "tesseract-geometry")
+
+def geometry_views(buf, slots, vertices, slot_size, slots_offset):
+    # (seq, frame, tick, palette, points) arrays striding over every slot
+    def field(dtype, shape, offset, strides):
+        return np.ndarray(shape, dtype, buffer=buf, offset=slots_offset + offset, strides=strides)
+    return (field(np.uint64, (slots,), 0, (slot_size,)),
+            field(np.uint64, (slots,), 8, (slot_size,)),
+            field(np.uint64, (slots,), 16, (slot_size,)),
+            field(np.uint8, (slots, 3, 3), 24, (slot_size, 3, 1)),
+            field(np.float32, (slots, vertices, 2), GEOMETRY_SLOT_HEADER, (slot_size, 8, 4)))
+
+class GeometryExporter:
+    def __init__(self, edges, vertex_count, path=DEFAULT_GEOMETRY_PATH, slots=GEOMETRY_SLOTS):
+        self.path = path
+        slot_size = GEOMETRY_SLOT_HEADER + vertex_count * 8
+        edges_offset = 64
+        slots_offset = edges_offset + len(edges) * 8
+        size = slots_offset + slots * slot_size
+        with open(path, "w+b") as f:
+            f.truncate(size)
+            self.map = mmap.mmap(f.fileno(), size)
+        GEOMETRY_HEADER.pack_into(self.map, 0, GEOMETRY_MAGIC, GEOMETRY_VERSION, slots, vertex_count,
+                                  len(edges), GAME_SIZE, slot_size, edges_offset, slots_offset)
+        np.ndarray((len(edges), 2), np.int32, buffer=self.map, offset=edges_offset)[:] = edges
+        self.points = geometry_views(self.map, slots, vertex_count, slot_size, slots_offset)[4]
+        self.offsets = [slots_offset + slot * slot_size for slot in range(slots)]
+        self.count = 0
+
+    def write(self, frame, tick, projected_2d, palette):
+        # projected_2d is in view units, before the canvas scale; the
+        # scalar fields go through struct, which is cheaper than numpy here
+        slot = self.count % len(self.offsets)
+        offset = self.offsets[slot]
+        (r0, g0, b0), (r1, g1, b1), (r2, g2, b2) = palette
+        GEOMETRY_SLOT.pack_into(self.map, offset, 2 * self.count + 1, frame, tick, r0, g0, b0, r1, g1, b1, r2, g2, b2)
+        points = self.points[slot]
+        np.multiply(projected_2d, 150, out=points, casting="unsafe")
+        points += GAME_SIZE / 2
+        GEOMETRY_SEQ.pack_into(self.map, offset, 2 * self.count + 2)
+        self.count += 1
+        GEOMETRY_SEQ.pack_into(self.map, GEOMETRY_LATEST_OFFSET, self.count)
+
+    def close(self):
+        del self.points
+        self.map.close()
+
+class GeometryReader:
+    # read side for other processes; read() copies the newest complete frame
+    def __init__(self, path=DEFAULT_GEOMETRY_PATH):
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, slots, vertex_count, edge_count, self.canvas_size,
+         slot_size, edges_offset, slots_offset) = GEOMETRY_HEADER.unpack_from(self.map, 0)
+        if magic != GEOMETRY_MAGIC or version != GEOMETRY_VERSION:
+            raise ValueError(f"{path} is not a version {GEOMETRY_VERSION} geometry stream")
+        self.edges = np.ndarray((edge_count, 2), np.int32, buffer=self.map, offset=edges_offset)
+        self.latest = np.ndarray((1,), np.uint64, buffer=self.map, offset=GEOMETRY_LATEST_OFFSET)
+        self.seq, self.frame, self.tick, self.palette, self.points = geometry_views(
+            self.map, slots, vertex_count, slot_size, slots_offset)
+
+    def read(self):
+        # (count, frame, tick, palette, points) or None before the first frame
+        while True:
+            count = int(self.latest[0])
+            if count == 0:
+                return None
+            slot = (count - 1) % len(self.seq)
+            seq = int(self.seq[slot])
+            result = (count, int(self.frame[slot]), int(self.tick[slot]),
+                      self.palette[slot].copy(), self.points[slot].copy())
+            # the writer lapped this slot while it was being copied
+            if seq % 2 == 0 and int(self.seq[slot]) == seq:
+                return result
+
+# input traces: INPUT_HEADER (magic, version, SHAPES index or CUSTOM_SHAPE,
+# dimensions, seed), then one INPUT_RECORD per event: the simulation tick it
+# was handled on, ms since the start, INPUT_TYPES index, key and modifiers
+INPUT_MAGIC = b"TSRI"
+INPUT_VERSION = 1
+INPUT_HEADER = struct.Struct("<4sHHHI")
+INPUT_RECORD = struct.Struct("<IIBIH")
+INPUT_TYPES = [pygame.KEYDOWN, pygame.KEYUP, pygame.QUIT]
+CUSTOM_SHAPE = 0xFFFF
+
+class InputRecorder:
+    # appends the handled key events to a binary trace through a buffered
+    # file, so a frame costs a struct pack per event
+    def __init__(self, path, shape_idx, dims, seed):
+        # checked before the file is opened, so a bad seed leaves no empty
+        # trace behind
+        if not 0 <= seed <= MAX_SEED:
+            raise ValueError(f"seed must be 0 to {MAX_SEED} to be recorded")
+        header = INPUT_HEADER.pack(INPUT_MAGIC, INPUT_VERSION, shape_idx, dims, seed)
+        self.file = open(path, "wb")
+        self.file.write(header)
+        self.start = time.perf_counter()
+        self.count = 0
+
+    def record(self, tick, events):
+        for event in events:
+            if event.type in INPUT_TYPES:
+                ms = int((time.perf_counter() - self.start) * 1000)
+                self.file.write(INPUT_RECORD.pack(tick, ms, INPUT_TYPES.index(event.type),
+                                                  getattr(event, 'key', 0), getattr(event, 'mod', 0) & 0xFFFF))
+                self.count += 1
+
+    def close(self):
+        self.file.close()
+
+class InputReplayer:
+    # hands a recorded trace back as pygame events on the simulation tick
+    # each was handled on. With the recorded seed and one tick per frame the
+    # simulation repeats exactly, whatever the frame rate.
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < INPUT_HEADER.size:
+            raise ValueError(f"{path} is not an input trace")
+        magic, version, self.shape_idx, self.dims, self.seed = INPUT_HEADER.unpack_from(data)
+        if magic != INPUT_MAGIC or version != INPUT_VERSION:
+            raise ValueError(f"{path} is not a version {INPUT_VERSION} input trace")
+        # a trace cut short by a crash ends at its last whole record
+        body = data[INPUT_HEADER.size:]
+        self.records = list(INPUT_RECORD.iter_unpack(body[:len(body) - len(body) % INPUT_RECORD.size]))
+        self.next = 0
+
+    @property
+    def done(self):
+        return self.next >= len(self.records)
+
+    def events(self, tick):
+        events = []
+        while self.next < len(self.records) and self.records[self.next][0] <= tick:
+            _, _, kind, key, mod = self.records[self.next]
+            events.append(pygame.event.Event(INPUT_TYPES[kind], key=key, mod=mod))
+            self.next += 1
+        return events
+
 class FadeSurface:
     def __init__(self, size):
         self.surface = pygame.Surface(size, pygame.SRCALPHA)
@@ -177,6 +1642,10 @@ class FadeSurface:
         self.target_alpha = 0
         self.speed = 15
 
+    def resize(self, size):
+        self.surface = pygame.Surface(size, pygame.SRCALPHA)
+        self.surface.set_alpha(self.alpha)
+
     def fade_in(self):
         self.target_alpha = 180
 
@@ -195,16 +1664,33 @@ class FadeSurface:
             surface.blit(self.surface, (0, 0))
 
 class TesseractApp:
-    def __init__(self):
-        self.display_surface = display_surface
-        self.game_surface = pygame.Surface((GAME_SIZE, GAME_SIZE))
-
-        self.points = generate_points()
-        self.edges = generate_edges(self.points)
-        self.angles = {axis: 0 for axis in ['xy','yz','zw','wv','vx','xz','yw']}
-        self.rot_speeds = {axis: random.uniform(0.005,0.02) for axis in self.angles}
-        self.scale = 150
-        self.center = (GAME_SIZE//2, GAME_SIZE//2)
+    def __init__(self, dimensions=DEFAULT_DIMENSIONS, seed=None, audio=True, render_scale=1.0,
+                 shape='hypercube', vertices=None):
+        init_pygame(audio)
+        # below 1.0 the canvas is rendered smaller and upscaled once per frame
+        self.render_scale = render_scale
+        # fixed here so an input trace can record it
+        self.seed = random.randrange(MAX_SEED + 1) if seed is None else seed
+        seed = self.seed
+        self.shape_idx = SHAPES.index(shape) if vertices is None else CUSTOM_SHAPE
+
+        if shape == 'hypercube' and vertices is None:
+            self.points = generate_points(dimensions)
+            self.edges = generate_edges(dimensions)
+            # keeps every cube as wide on screen as the 5D one
+            self.radius = math.sqrt(DEFAULT_DIMENSIONS / dimensions)
+        else:
+            # meshes have unit circumradius; at 2 they project about as wide
+            # as the 5D cube
+            self.points, self.edges = load_mesh(shape, vertices)
+            self.radius = 2.0
+        self.dimensions = self.points.shape[1]
+        self.edge_paths = edge_paths(self.edges, len(self.points))
+        self.angles = {axis: 0 for axis in rotation_planes(self.dimensions)}
+        self.prev_angles = dict(self.angles)
+        rng = random.Random(seed)
+        self.rot_speeds = {axis: rng.uniform(0.005,0.02) for axis in self.angles}
+        self.chaos = ChaosEngine(self.angles, seed)
 
         self.palette_set_idx = 0
         self.palette_idx_in_set = 0
@@ -214,6 +1700,14 @@ class TesseractApp:
         self.control_style = CONTROL_STYLES[self.control_style_idx]
 
         self.motion_blur = True
+        self.blur_style = BLUR_STYLES[0]
+        # ring buffer of past frames for the trails blur style
+        self.trail_points = np.zeros((TRAIL_LENGTH, len(self.points), 2), dtype=np.int32)
+        self.trail_colors = np.zeros((TRAIL_LENGTH, 2, 3), dtype=np.uint8)
+        self.trail_fade = TRAIL_DECAY ** np.arange(TRAIL_LENGTH, 0, -1)
+        self.trail_head = 0
+        self.trail_count = 0
+        self.antialias = False
         self.show_keybinds = False
 
         self.state = 1  # 0 = Visualization , 1 = MainMenu, 2 = PaletteMenu, 3 = KeybindMenu
@@ -221,15 +1715,56 @@ class TesseractApp:
         self.palette_fade = FadeSurface((GAME_SIZE, GAME_SIZE))
         self.keybind_fade = FadeSurface((GAME_SIZE, GAME_SIZE))
 
+        # HUD text is composited once into this layer and rebuilt on change
+        self.hud_layer = None
+        self.hud_rects = []
+        self.hud_key = None
+
+        # a field of independently rotating copies replaces the single cube
+        # when set_instances() is given more than one
+        self.instances = None
+        self.view_grid = None
+
+        self.profiler = FrameProfiler()
+        self.control = None
+        # keys held down, tracked from events so a replay can press them
+        self.held_keys = defaultdict(bool)
+        self.keymap = {}
+        self.set_keymap()
+        self.input_recorder = None
+        self.replayer = None
+        self.exporter = None
+        self.governor = QualityGovernor()
+        self.lod_edge_paths = None
+        self.recorder = FrameRecorder()
+        # screen-space culling of the single shape; max_segments caps what
+        # is submitted, longest first
+        self.culling = False
+        self.max_segments = None
+        self.segments = None
+        self.cull_stats = None
+        # glow is added to the window at present time, never to the canvas,
+        # so screen blur does not feed it back into later frames
+        self.bloom = None
+        self.bloom_options = (BLOOM_SCALE, BLOOM_RADIUS)
+        self.glow_pending = False
+
+        self.game_surface = None
+        self.canvas_size = None
+        self.resize()
+
         self.running = True
         self.frame_count = 0
+        self.max_fps = 60  # 0 runs uncapped
+        self.sim_ticks = 0
+        self.sim_accumulator = 0.0
         self.chaos_mode = False
-        self.last_chaos_change = time.time()
-        self.chaos_change_interval = 0.02
-        self.last_palette_switch = time.time()
 
         self.menu_selected = 0
         self.fullscreen = False
+        self.menu_lines = None
+        self.menu_drawn_state = None
+        self.menu_settle_frames = 0
 
         # Chaos mode cycling
         self.chaos_palette_set = 0
@@ -244,10 +1779,22 @@ class TesseractApp:
         idx %= len(ALL_PALETTES)
         self.current_palette = ALL_PALETTES[idx]
         self.current_palette_name = PALETTE_NAMES[idx] if idx < len(PALETTE_NAMES) else f"Palette {idx+1}"
+        # the rainbow only runs in the first set, later sets wrap onto it
+        if idx == RAINBOW_PALETTE_IDX and self.palette_set_idx != 0:
+            self.palette_table = None
+        else:
+            self.palette_table = palette_animation_table(idx)
 
-    def play_sound(self, sound):
-        if sound:
-            sound.play()
+    def play_sound(self, name):
+        assets.play(name)
+
+    def play_music(self):
+        if assets.music_loaded:
+            pygame.mixer.music.play(-1)
+
+    def stop_music(self):
+        if assets.music_loaded:
+            pygame.mixer.music.stop()
 
     def toggle_fullscreen(self):
         self.fullscreen = not self.fullscreen
@@ -256,14 +1803,124 @@ class TesseractApp:
             self.display_surface = pygame.display.set_mode((info.current_w, info.current_h), pygame.FULLSCREEN)
         else:
             self.display_surface = pygame.display.set_mode((GAME_SIZE, GAME_SIZE), pygame.RESIZABLE)
+        self.resize()
+
+    def resize(self):
+        # the square canvas sits centred on the window at native resolution;
+        # buffers are only reallocated when the canvas size changes
+        self.display_surface = pygame.display.get_surface()
+        dw, dh = self.display_surface.get_size()
+        side = min(dw, dh)
+        self.view_rect = pygame.Rect((dw - side) // 2, (dh - side) // 2, side, side)
+        self.display_surface.fill((0, 0, 0))
+        self.view = self.display_surface.subsurface(self.view_rect)
+        # the window was just cleared, so a menu is redrawn in full even
+        # when the canvas keeps its size
+        self.menu_drawn_state = None
+
+        canvas = max(1, round(side * self.render_scale * self.governor.settings["render_scale"]))
+        if canvas == side and self.bloom is None:
+            self.game_surface = self.view
+        elif self.game_surface is None or self.game_surface.get_size() != (canvas, canvas) or self.game_surface.get_parent() is not None:
+            self.game_surface = pygame.Surface((canvas, canvas), 0, self.display_surface)
+        if self.bloom is not None:
+            self.bloom.resize(canvas, self.view_rect.size)
+        if canvas == self.canvas_size:
+            return
+
+        self.canvas_size = canvas
+        self.ui_scale = canvas / GAME_SIZE
+        set_font_scale(self.ui_scale)
+        self.scale = 150 * self.ui_scale
+        self.center = (canvas // 2, canvas // 2)
+
+        self.motion_blur_surface = pygame.Surface((canvas, canvas))
+        self.motion_blur_surface.set_alpha(40)
+        self.motion_blur_surface.fill((0,0,0))
+        self.trail_count = 0
+        self.palette_fade.resize((canvas, canvas))
+        self.keybind_fade.resize((canvas, canvas))
+        self.hud_layer = pygame.Surface((canvas, canvas), pygame.SRCALPHA)
+        self.hud_rects = []
+        self.hud_key = None
+        self.profiler.ui_scale = self.ui_scale
+        self.profiler.panel = None
+
+    def px(self, length):
+        # design-space pixels (on a GAME_SIZE canvas) to canvas pixels
+        return round(length * self.ui_scale)
+
+    def present(self):
+        if self.game_surface is not self.view:
+            if self.game_surface.get_size() == self.view_rect.size:
+                self.view.blit(self.game_surface, (0, 0))
+            else:
+                pygame.transform.smoothscale(self.game_surface, self.view_rect.size, self.view)
+        if self.glow_pending:
+            self.bloom.apply(self.view)
+            self.glow_pending = False
+
     def draw_text(self, text, pos, font, color=(255,255,255)):
-        surf = font.render(text, True, color)
+        surf = text_cache.render(font, text, color)
         self.game_surface.blit(surf, pos)
 
+    def build_hud_layer(self):
+        for rect in self.hud_rects:
+            self.hud_layer.fill((0, 0, 0, 0), rect)
+        self.hud_rects = []
+
+        def add(text, pos, font, color):
+            surf = text_cache.render(font, text, color)
+            self.hud_rects.append(self.hud_layer.blit(surf, pos))
+
+        for i, line in enumerate(HUD_LINES):
+            add(line, (self.px(10), self.px(10 + i*30)), font, HUD_COLOR)
+        add(f"Control: {self.control_style.capitalize()} | Palette Set: {self.palette_set_idx+1} | Palette #: {self.palette_idx_in_set+1}", (self.px(10), self.canvas_size - self.px(30)), font, HUD_COLOR)
+        if self.chaos_mode:
+            chaos_text = "CHAOS MODE ACTIVE"
+            add(chaos_text, (self.canvas_size - big_font.size(chaos_text)[0] - self.px(20), self.px(20)), big_font, (255, 50, 50))
+
+    def draw_hud(self):
+        key = (self.control_style, self.palette_set_idx, self.palette_idx_in_set, self.chaos_mode)
+        if key != self.hud_key:
+            self.build_hud_layer()
+            self.hud_key = key
+        for rect in self.hud_rects:
+            self.game_surface.blit(self.hud_layer, rect, rect)
+
+    def invalidate_menu(self):
+        self.menu_lines = None
+
+    def draw_menu_lines(self, lines, background):
+        # lines are (text, pos, font, color); only lines that changed since
+        # the last draw are repainted, and their rects returned as dirty
+        dirty = []
+        drawn = self.menu_lines
+        if drawn is None:
+            self.game_surface.fill(background)
+            dirty.append(self.game_surface.get_rect())
+            drawn = []
+        self.menu_lines = []
+        for i, line in enumerate(lines):
+            old = drawn[i] if i < len(drawn) else None
+            if old is not None and old[0] == line:
+                self.menu_lines.append(old)
+                continue
+            if old is not None:
+                self.game_surface.fill(background, old[1])
+                dirty.append(old[1])
+            text, pos, line_font, color = line
+            rect = self.game_surface.blit(text_cache.render(line_font, text, color), pos)
+            self.menu_lines.append((line, rect))
+            dirty.append(rect)
+        for line, rect in drawn[len(lines):]:
+            self.game_surface.fill(background, rect)
+            dirty.append(rect)
+        return dirty
+
     def draw_main_menu(self):
-        self.game_surface.fill((0,0,0))
         title = "Main Menu"
-        self.draw_text(title, (self.center[0] - big_font.size(title)[0]//2, 100), big_font)
+        lines = [(title, (self.center[0] - big_font.size(title)[0]//2, self.px(100)), big_font, (255,255,255))]
 
         menu_items = [
             f"Control Style: {self.control_style.capitalize()}",
@@ -273,32 +1930,47 @@ class TesseractApp:
         ]
         for idx, item in enumerate(menu_items):
             color = (255,255,0) if idx == self.menu_selected else (255,255,255)
-            self.draw_text(item, (self.center[0] - 250, 250 + idx*50), font, color)
+            lines.append((item, (self.center[0] - self.px(250), self.px(250 + idx*50)), font, color))
 
         line1 = "Use UP/DOWN to navigate menu,"
         line2 = "Use < or > to switch palette, ENTER to select"
-
-        line1_surf = font.render(line1, True, (180, 180, 180))
-        line2_surf = font.render(line2, True, (180, 180, 180))
-
-        self.game_surface.blit(line1_surf, ((GAME_SIZE - line1_surf.get_width()) // 2, 600))
-        self.game_surface.blit(line2_surf, ((GAME_SIZE - line2_surf.get_width()) // 2, 630))
+        lines.append((line1, ((self.canvas_size - font.size(line1)[0]) // 2, self.px(600)), font, (180, 180, 180)))
+        lines.append((line2, ((self.canvas_size - font.size(line2)[0]) // 2, self.px(630)), font, (180, 180, 180)))
+        return self.draw_menu_lines(lines, (0,0,0))
 
     def draw_palette_menu(self):
-        self.game_surface.fill((10,10,10))
         title = f"Palette Menu - Set {self.palette_set_idx+1} of 10"
-        self.draw_text(title, (self.center[0] - big_font.size(title)[0]//2, 20), big_font)
+        lines = [(title, (self.center[0] - big_font.size(title)[0]//2, self.px(20)), big_font, (255,255,255))]
 
         start_idx = self.palette_set_idx * 10
         for i in range(10):
             idx = start_idx + i
             name = PALETTE_NAMES[idx] if idx < len(PALETTE_NAMES) else f"Palette {idx+1}"
-            y = 100 + i*40
+            y = self.px(100 + i*40)
             color = (255,255,0) if i == self.palette_idx_in_set else (200,200,200)
-            self.draw_text(f"{i+1}. - {name}", (50, y), font, color)
+            lines.append((f"{i+1}. - {name}", (self.px(50), y), font, color))
 
         instruction = "LEFT/RIGHT: Change set | 1-0: Select palette | SHIFT+P: Exit palette menu"
-        self.draw_text(instruction, ((GAME_SIZE - font.size(instruction)[0])//2, GAME_SIZE - 40), font, (180,180,180))
+        lines.append((instruction, ((self.canvas_size - font.size(instruction)[0])//2, self.canvas_size - self.px(40)), font, (180,180,180)))
+        return self.draw_menu_lines(lines, (10,10,10))
+
+    def track_menu_state(self):
+        # a menu that was just entered is drawn from scratch
+        if self.state == 0:
+            self.menu_drawn_state = None
+        elif self.state != self.menu_drawn_state:
+            self.trail_count = 0
+            self.invalidate_menu()
+            self.menu_drawn_state = self.state
+            self.menu_settle_frames = MENU_SETTLE_FRAMES
+
+    def menu_animating(self):
+        # a menu needs frames while its fade runs and for a few frames after,
+        # until the repeated overlay blits have settled
+        fade = {2: self.palette_fade, 3: self.keybind_fade}.get(self.state)
+        if fade is not None and fade.alpha != fade.target_alpha:
+            self.menu_settle_frames = MENU_SETTLE_FRAMES
+        return self.menu_settle_frames > 0
 
     def draw_keybind_menu(self):
         self.keybind_fade.surface.fill((0,0,0,180))
@@ -308,341 +1980,720 @@ class TesseractApp:
             "WASD/QE: Rotate (manual control)",
             "SPACE: Cycle palette in current set (disabled in chaos mode)",
             "B: Toggle motion blur",
+            "T: Switch blur style (screen/trails)",
             "ESC: Return to menu",
             "SHIFT + M: Toggle keybind menu",
             "SHIFT + P: Toggle palette menu (disabled in chaos mode)",
             "C: Toggle Chaos Mode",
             "F11: Toggle fullscreen",
+            "L: Toggle anti-aliasing",
+            "G: Toggle glow",
+            "F3: Toggle profiler",
+            "F4: Toggle adaptive quality",
+            "F9: Toggle recording",
         ]
-        y = 50
-        for line in lines:
-            text_surf = font.render(line, True, (255,255,255))
-            self.keybind_fade.surface.blit(text_surf, (50, y))
-            y += 30
+        for i, line in enumerate(lines):
+            text_surf = text_cache.render(font, line, (255,255,255))
+            self.keybind_fade.surface.blit(text_surf, (self.px(50), self.px(50 + i*30)))
         self.keybind_fade.update()
         self.keybind_fade.draw(self.game_surface)
 
-    def handle_main_menu_events(self, event):
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_F11:
-                self.toggle_fullscreen()
-            mods = pygame.key.get_mods()
-            # Only allow shift + num if not in chaos mode
-            if not self.chaos_mode and mods & pygame.KMOD_SHIFT:
-                key_to_set = {
-                    pygame.K_1: 0,
-                    pygame.K_2: 1,
-                    pygame.K_3: 2,
-                    pygame.K_4: 3,
-                    pygame.K_5: 4,
-                    pygame.K_6: 5,
-                    pygame.K_7: 6,
-                    pygame.K_8: 7,
-                    pygame.K_9: 8,
-                    pygame.K_0: 9,
-                }
-                if event.key in key_to_set:
-                    self.palette_set_idx = key_to_set[event.key]
-                    self.palette_idx_in_set = 0
-                    self.update_current_palette()
-                    self.play_sound(random.choice(beep_sounds))
-                    return
-
-            if event.key == pygame.K_UP:
-                self.menu_selected = (self.menu_selected - 1) % 4
-                self.play_sound(random.choice(beep_sounds))
-            elif event.key == pygame.K_DOWN:
-                self.menu_selected = (self.menu_selected + 1) % 4
-                self.play_sound(random.choice(beep_sounds))
-            elif event.key == pygame.K_LEFT:
-                if self.menu_selected == 1:
-                    self.palette_set_idx = (self.palette_set_idx - 1) % 10
-                    self.palette_idx_in_set = 0
-                    self.update_current_palette()
-                    self.play_sound(random.choice(beep_sounds))
-            elif event.key == pygame.K_RIGHT:
-                if self.menu_selected == 1:
-                    self.palette_set_idx = (self.palette_set_idx + 1) % 10
-                    self.palette_idx_in_set = 0
-                    self.update_current_palette()
-                    self.play_sound(random.choice(beep_sounds))
-            elif event.key == pygame.K_RETURN:
-                self.play_sound(startup_sound)
-                if self.menu_selected == 0:
-                    self.control_style_idx = (self.control_style_idx + 1) % len(CONTROL_STYLES)
-                    self.control_style = CONTROL_STYLES[self.control_style_idx]
-                elif self.menu_selected == 2:
-                    self.state = 0  # Visualization
-                    pygame.mixer.music.play(-1)
-                elif self.menu_selected == 3:
-                    self.running = False
+    def set_keymap(self, text=None):
+        # DEFAULT_KEYMAP with text's lines on top, resolved to bound methods
+        # once so a keypress is a single dict lookup
+        bindings = parse_keymap(DEFAULT_KEYMAP)
+        if text is not None:
+            parse_keymap(text, bindings)
+        self.keymap = {binding: (getattr(self, f"action_{action}"), arg)
+                       for binding, (action, arg) in bindings.items()}
+
+    def handle_key(self, event):
+        # a binding without shift also answers shift + that key, unless
+        # shift + key has its own
+        shift = bool(event.mod & pygame.KMOD_SHIFT)
+        binding = self.keymap.get((self.state, event.key, shift))
+        if binding is None and shift:
+            binding = self.keymap.get((self.state, event.key, False))
+        if binding is not None:
+            action, arg = binding
+            action(arg)
+
+    def step_palette_set(self, step):
+        self.palette_set_idx = (self.palette_set_idx + step) % 10
+        self.palette_idx_in_set = 0
+        self.update_current_palette()
+        self.play_sound("beep")
+
+    def action_fullscreen(self, arg):
+        self.toggle_fullscreen()
+
+    def action_menu_move(self, step):
+        self.menu_selected = (self.menu_selected + step) % 4
+        self.play_sound("beep")
+
+    def action_menu_adjust(self, step):
+        if self.menu_selected == 1:
+            self.step_palette_set(step)
+
+    def action_menu_select(self, arg):
+        self.play_sound("startup")
+        if self.menu_selected == 0:
+            self.control_style_idx = (self.control_style_idx + 1) % len(CONTROL_STYLES)
+            self.control_style = CONTROL_STYLES[self.control_style_idx]
+        elif self.menu_selected == 2:
+            self.state = 0  # Visualization
+            self.play_music()
+        elif self.menu_selected == 3:
+            self.running = False
+
+    def show_state(self, state):
+        # the palette menu is disabled in chaos mode; returns whether the
+        # state changed
+        if state == 2 and self.chaos_mode:
+            return False
+        self.state = state
+        if state == 2:
+            self.palette_fade.fade_in()
+        elif state == 3:
+            self.keybind_fade.fade_in()
+        return True
+
+    def action_show(self, state):
+        if self.show_state(state):
+            self.play_sound("beep")
+
+    def action_palette_set(self, idx):
+        if not self.chaos_mode:
+            self.step_palette_set(idx - self.palette_set_idx)
+
+    def action_palette_step(self, step):
+        if not self.chaos_mode:
+            self.step_palette_set(step)
+
+    def action_palette(self, idx):
+        if not self.chaos_mode:
+            self.palette_idx_in_set = idx
+            self.update_current_palette()
+            self.play_sound("beep")
 
-    def handle_palette_menu_events(self, event):
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_F11:
-                self.toggle_fullscreen()
-            if self.chaos_mode:
-                return  # palette menu disabled in chaos mode
-            if event.key == pygame.K_LEFT:
-                self.palette_set_idx = (self.palette_set_idx - 1) % 10
-                self.palette_idx_in_set = 0
-                self.update_current_palette()
-                self.play_sound(random.choice(beep_sounds))
-            elif event.key == pygame.K_RIGHT:
-                self.palette_set_idx = (self.palette_set_idx + 1) % 10
-                self.palette_idx_in_set = 0
-                self.update_current_palette()
-                self.play_sound(random.choice(beep_sounds))
-            elif pygame.K_1 <= event.key <= pygame.K_9 or event.key == pygame.K_0:
-                key_to_idx = {pygame.K_1:0,pygame.K_2:1,pygame.K_3:2,pygame.K_4:3,pygame.K_5:4,
-                              pygame.K_6:5,pygame.K_7:6,pygame.K_8:7,pygame.K_9:8,pygame.K_0:9}
-                if event.key in key_to_idx:
-                    self.palette_idx_in_set = key_to_idx[event.key]
-                    self.update_current_palette()
-                    self.play_sound(random.choice(beep_sounds))
-            elif event.key == pygame.K_p and (pygame.key.get_mods() & pygame.KMOD_SHIFT):
-                self.state = 0  # back to visualization
-                self.play_sound(random.choice(beep_sounds))
-            elif event.key == pygame.K_ESCAPE:
-                self.state = 1  # back to main menu
-                self.play_sound(random.choice(beep_sounds))
-
-    def handle_keybind_menu_events(self, event):
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_F11:
-                self.toggle_fullscreen()
-            if event.key == pygame.K_m and (pygame.key.get_mods() & pygame.KMOD_SHIFT):
-                self.state = 0  # back to visualization
-                self.play_sound(random.choice(beep_sounds))
-            elif event.key == pygame.K_ESCAPE:
-                self.state = 1  # back to main menu
-                self.play_sound(random.choice(beep_sounds))
+    def action_next_palette(self, arg):
+        if not self.chaos_mode:
+            self.action_palette((self.palette_idx_in_set + 1) % 10)
+
+    def action_exit_to_menu(self, arg):
+        self.return_to_menu()
+
+    def action_toggle_blur(self, arg):
+        self.motion_blur = not self.motion_blur
+        self.trail_count = 0
+        self.play_sound("beep")
+
+    def action_next_blur_style(self, arg):
+        self.blur_style = BLUR_STYLES[(BLUR_STYLES.index(self.blur_style) + 1) % len(BLUR_STYLES)]
+        self.trail_count = 0
+        self.play_sound("beep")
+
+    def action_toggle_antialias(self, arg):
+        self.antialias = not self.antialias
+        self.play_sound("beep")
+
+    def action_chaos(self, arg):
+        self.set_chaos(not self.chaos_mode)
+        self.play_sound("beep")
+
+    def action_governor(self, arg):
+        self.set_quality_governor(not self.governor.enabled)
+        self.play_sound("beep")
+
+    def action_bloom(self, arg):
+        self.set_bloom(self.bloom is None, *self.bloom_options)
+        self.play_sound("beep")
+
+    def action_record(self, arg):
+        self.toggle_recording()
+
+    def action_profiler(self, arg):
+        self.profiler.toggle_overlay()
+        self.play_sound("beep")
 
     def update_angles_auto(self):
         for axis in self.angles:
             self.angles[axis] += self.rot_speeds[axis]
 
+    def set_frame(self, frame):
+        # auto rotation state from the frame index alone, matching what
+        # update_angles_auto has accumulated after that many steps
+        self.frame_count = frame
+        self.sim_ticks = frame
+        for axis in self.angles:
+            self.angles[axis] = self.rot_speeds[axis] * frame
+        self.prev_angles.update(self.angles)
+
+    def step_simulation(self, keys):
+        self.prev_angles.update(self.angles)
+        if self.control_style == 'auto':
+            if self.chaos_mode:
+                self.update_chaos_mode()
+            self.update_angles_auto()
+        else:
+            self.update_angles_manual(keys)
+        self.sim_ticks += 1
+
+    def advance_simulation(self, elapsed, keys):
+        self.sim_accumulator += elapsed
+        while self.sim_accumulator >= SIM_STEP:
+            self.step_simulation(keys)
+            self.sim_accumulator -= SIM_STEP
+
+    def interpolated_angles(self):
+        # renders between the last two steps so motion stays smooth when
+        # the frame rate is not a multiple of SIM_HZ
+        alpha = self.sim_accumulator / SIM_STEP
+        return {axis: prev + (self.angles[axis] - prev) * alpha for axis, prev in self.prev_angles.items()}
+
     def update_angles_manual(self, keys):
         speed = 0.03
-        if keys[pygame.K_w]:
-            self.angles['xy'] += speed
-        if keys[pygame.K_s]:
-            self.angles['xy'] -= speed
-        if keys[pygame.K_a]:
-            self.angles['yz'] += speed
-        if keys[pygame.K_d]:
-            self.angles['yz'] -= speed
-        if keys[pygame.K_q]:
-            self.angles['zw'] += speed
-        if keys[pygame.K_e]:
-            self.angles['zw'] -= speed
+        for plus, minus, plane in ((pygame.K_w, pygame.K_s, 'xy'),
+                                   (pygame.K_a, pygame.K_d, 'yz'),
+                                   (pygame.K_q, pygame.K_e, 'zw')):
+            if plane not in self.angles:
+                continue
+            if keys[plus]:
+                self.angles[plane] += speed
+            if keys[minus]:
+                self.angles[plane] -= speed
 
     def update_chaos_mode(self):
-        current_time = time.time()
-        if current_time - self.last_chaos_change > self.chaos_change_interval:
-            for axis in self.rot_speeds:
-                self.rot_speeds[axis] = random.uniform(-0.1, 0.1)
-            self.last_chaos_change = current_time
-
-        if current_time - self.last_palette_switch > 0.02:
-            self.chaos_palette_idx += 1
-            if self.chaos_palette_idx > 9:
-                self.chaos_palette_idx = 0
-                self.chaos_palette_set += 1
-                if self.chaos_palette_set > 9:
-                    self.chaos_palette_set = 0
-
-            self.palette_set_idx = self.chaos_palette_set
-            self.palette_idx_in_set = self.chaos_palette_idx
+        # once per simulation tick, so chaos follows the tick count and not
+        # the wall clock
+        self.rot_speeds.update(self.chaos.speeds_at(self.sim_ticks))
+
+        self.chaos_palette_idx += 1
+        if self.chaos_palette_idx > 9:
+            self.chaos_palette_idx = 0
+            self.chaos_palette_set += 1
+            if self.chaos_palette_set > 9:
+                self.chaos_palette_set = 0
+
+        # chaos colors come from the engine, so only the HUD numbers change;
+        # set_chaos resolves the palette again on the way out
+        self.palette_set_idx = self.chaos_palette_set
+        self.palette_idx_in_set = self.chaos_palette_idx
+
+    def return_to_menu(self):
+        self.state = 1
+        self.chaos_mode = False
+        # restore last palette when exiting chaos mode
+        self.palette_set_idx = self.last_normal_palette_set
+        self.palette_idx_in_set = self.last_normal_palette_idx
+        self.update_current_palette()
+        self.play_sound("escape")
+        self.stop_music()
+
+    def set_chaos(self, on):
+        if on == self.chaos_mode:
+            return
+        self.chaos_mode = on
+        self.motion_blur = True
+        if self.chaos_mode:
+            # preserves current palette before chaos mode
+            self.last_normal_palette_set = self.palette_set_idx
+            self.last_normal_palette_idx = self.palette_idx_in_set
+            # start chaos mode cycling at current
+            self.chaos_palette_set = self.palette_set_idx
+            self.chaos_palette_idx = self.palette_idx_in_set
+        else:
+            # restore palette after chaos mode
+            self.palette_set_idx = self.last_normal_palette_set
+            self.palette_idx_in_set = self.last_normal_palette_idx
             self.update_current_palette()
-            self.last_palette_switch = current_time
 
-    def draw_tesseract(self):
-        rotated_points = [rotate_5d(p, self.angles) for p in self.points]
-        projected_3d = [project_5d_to_3d(p) for p in rotated_points]
-        projected_2d = [project_3d_to_2d(p) for p in projected_3d]
+    def start_geometry_export(self, path=DEFAULT_GEOMETRY_PATH):
+        self.exporter = GeometryExporter(self.edges, len(self.points), path)
 
-        points_2d = []
-        for x, y in projected_2d:
-            sx = x * self.scale + self.center[0]
-            sy = y * self.scale + self.center[1]
-            points_2d.append((sx, sy))
+    def start_control_server(self, port=CONTROL_PORT):
+        self.control = ControlServer(self.angles, port)
+        self.control.start()
 
-        if self.chaos_mode:
-            palette = [ (random.randint(0,255), random.randint(0,255), random.randint(0,255)) for _ in range(3) ]
-        elif self.palette_set_idx == 0 and self.palette_idx_in_set == 1:
-            c1 = rainbow_color(self.frame_count, speed=0.01)
-            c2 = rainbow_color(self.frame_count + 85, speed=0.01)
-            c3 = rainbow_color(self.frame_count + 170, speed=0.01)
-            palette = [c1, c2, c3]
-        elif "Shift" in self.current_palette_name:
-            base_name = self.current_palette_name.replace(" Shift","")
-            if base_name in PALETTE_NAMES:
-                base_idx = PALETTE_NAMES.index(base_name)
-                base_palette = fixed_palettes[base_idx % len(fixed_palettes)]
-                palette = color_shift_palette(base_palette, self.frame_count, speed=0.01)
+    def apply_command(self, command):
+        # commands from the control server, already validated by parse_command
+        name = command[0]
+        if name == 'palette':
+            idx = command[1]
+            if idx == 'next':
+                idx = self.palette_set_idx * 10 + (self.palette_idx_in_set + 1) % 10
+            if self.chaos_mode:
+                # takes effect when chaos mode ends
+                self.last_normal_palette_set, self.last_normal_palette_idx = divmod(idx, 10)
             else:
-                palette = self.current_palette
+                self.palette_set_idx, self.palette_idx_in_set = divmod(idx, 10)
+                self.update_current_palette()
+        elif name == 'chaos':
+            self.set_chaos(not self.chaos_mode if command[1] == 'toggle' else command[1] == 'on')
+        elif name == 'speed':
+            for axis in (self.rot_speeds if command[1] == 'all' else [command[1]]):
+                self.rot_speeds[axis] = command[2]
+        elif name == 'state':
+            state = command[1]
+            if state == 1 and self.state != 1:
+                self.return_to_menu()
+            elif state != self.state:
+                leaving_menu = self.state == 1
+                if self.show_state(state) and leaving_menu:
+                    self.play_music()
+        elif name == 'blur':
+            if command[1] in BLUR_STYLES:
+                self.blur_style = command[1]
+            self.motion_blur = command[1] != 'off'
+            self.trail_count = 0
+        elif name == 'quit':
+            self.running = False
+
+    def set_views(self, names):
+        self.view_grid = ViewGrid(names, self.dimensions) if names else None
+
+    def draw_views(self, angles=None):
+        # the rotation is done once and shared by every tile
+        rotated = rotate_points(self.points, angles or self.angles, self.radius)
+        palette = self.frame_palette()
+        paths, dots = self.current_edge_paths()
+        antialias = self.antialias and self.governor.settings["antialias"]
+        self.profiler.mark("geometry")
+
+        for (tile, rect), view, matrix, name in zip(self.view_grid.layout(self.game_surface), self.view_grid.views,
+                                                    self.view_grid.matrices, self.view_grid.names):
+            k = rect.width / self.canvas_size
+            points_2d = (project_view(rotated, matrix, view) * self.scale * k + rect.width // 2).astype(int)
+            for path in paths:
+                if antialias:
+                    pygame.draw.aalines(tile, palette[1], False, points_2d[path].tolist())
+                else:
+                    pygame.draw.lines(tile, palette[1], False, points_2d[path].tolist())
+            if dots:
+                radius = max(1, round(self.px(5) * k))
+                sprite = dot_sprite(palette[0], radius, antialias)
+                tile.blits([(sprite, (x - radius, y - radius)) for x, y in points_2d.tolist()], False)
+            pygame.draw.rect(tile, (60, 60, 60), tile.get_rect(), 1)
+            tile.blit(text_cache.render(small_font, name, HUD_COLOR), (self.px(6), self.px(4)))
+
+    def set_instances(self, count, seed=None):
+        self.instances = InstanceField(self.points, self.edge_paths, count, self.radius, seed) if count > 1 else None
+
+    def draw_instances(self):
+        # in auto mode interpolated_angles() is rot_speeds * this time
+        t = self.sim_ticks - 1 + self.sim_accumulator / SIM_STEP
+        self.instances.draw(self.game_surface, t, self.ui_scale)
+
+    def set_quality_governor(self, enabled):
+        self.governor.enabled = enabled
+        if not enabled and self.governor.tier:
+            self.governor.reset()
+            self.apply_quality()
+
+    def apply_quality(self):
+        # render scale changes reallocate the canvas; trails restart either way
+        self.resize()
+        self.trail_count = 0
+        self.hud_key = None
+
+    def effective_blur_style(self):
+        if self.blur_style == 'screen' and not self.governor.settings["screen_blur"]:
+            return 'trails'
+        return self.blur_style
+
+    def current_edge_paths(self):
+        # (paths, draw vertex dots) for this quality tier
+        if self.governor.settings["edge_lod"] and len(self.edges) > LOD_MIN_EDGES:
+            if self.lod_edge_paths is None:
+                self.lod_edge_paths = edge_paths(self.edges[::2], len(self.points))
+            return self.lod_edge_paths, False
+        return self.edge_paths, True
+
+    def cull(self, points_2d, paths, radius):
+        # splits the paths into the runs of segments that survive culling.
+        # Zero-length segments inside a run drop their end point and
+        # off-screen ones between two drawn ones are left for pygame to
+        # clip, rather than splitting it, since each extra run is another
+        # draw call. The joined paths are cached per set of paths.
+        if self.segments is None or self.segments[0] is not paths:
+            self.segments = (paths,) + path_segments(paths)
+        _, flat, valid = self.segments
+        keep, zero, off, dots = cull_segments(points_2d, flat, valid, self.canvas_size, radius, self.max_segments)
+        total, clipped = int(valid.sum()), int(off.sum())
+        self.cull_stats = (total - int(keep.sum()) - clipped, total, clipped, len(points_2d) - len(dots), len(points_2d))
+
+        bounds = np.diff((keep | zero | off).view(np.int8), prepend=0, append=0)
+        retained = np.concatenate(([True], ~zero))
+        # run bounds in the point list left after dropping those points
+        position = np.cumsum(retained)
+        firsts = position[np.flatnonzero(bounds == 1)] - 1
+        lasts = position[np.flatnonzero(bounds == -1)]
+        ordered = points_2d[flat[retained]].tolist()
+        lines = [ordered[first:last] for first, last in zip(firsts.tolist(), lasts.tolist()) if last - first > 1]
+        return lines, points_2d[dots].tolist()
+
+    def clear_canvas(self):
+        if self.motion_blur and self.effective_blur_style() == 'screen':
+            self.game_surface.blit(self.motion_blur_surface, (0, 0))
         else:
-            palette = self.current_palette
+            self.game_surface.fill((0, 0, 0))
+
+    def draw_trails(self, points_2d, palette, paths, dots):
+        # draws the stored frames oldest first, then records this one; the
+        # faded copies use 1px lines without anti-aliasing, which keeps them
+        # cheap at high resolutions
+        count = self.trail_count
+        if count:
+            slots = (self.trail_head - count + np.arange(count)) % TRAIL_LENGTH
+            colors = (self.trail_colors[slots] * self.trail_fade[-count:, None, None]).astype(np.uint8).tolist()
+            radius = max(1, self.px(5))
+            for slot, (vertex_color, edge_color) in zip(slots.tolist(), colors):
+                points = self.trail_points[slot]
+                for path in paths:
+                    pygame.draw.lines(self.game_surface, edge_color, False, points[path].tolist())
+                if dots:
+                    sprite = dot_sprite(vertex_color, radius)
+                    self.game_surface.blits([(sprite, (x - radius, y - radius)) for x, y in points.tolist()], False)
+
+        self.trail_points[self.trail_head] = points_2d
+        self.trail_colors[self.trail_head] = palette[:2]
+        self.trail_head = (self.trail_head + 1) % TRAIL_LENGTH
+        self.trail_count = min(count + 1, TRAIL_LENGTH)
+
+    def set_bloom(self, enabled, scale=BLOOM_SCALE, radius=BLOOM_RADIUS):
+        self.bloom = Bloom(scale, radius) if enabled else None
+        self.glow_pending = False
+        self.resize()
+
+    def render_bloom(self):
+        # after the geometry and before the HUD, so text does not glow
+        if self.bloom is not None and self.governor.settings["bloom"]:
+            self.bloom.render(self.game_surface)
+            self.glow_pending = True
+
+    def toggle_recording(self):
+        # the status goes in the window title so it never ends up in the frames
+        if self.recorder.recording:
+            self.recorder.stop()
+            pygame.display.set_caption("4D Cube (Tesseract)")
+        elif self.recorder.start(self.view.get_size()):
+            pygame.display.set_caption(f"4D Cube (Tesseract) - {self.recorder.status()}")
+
+    def frame_palette(self):
+        if self.chaos_mode:
+            return self.chaos.colors_at(self.sim_ticks)
+        elif self.palette_table is not None:
+            return self.palette_table[self.sim_ticks % PALETTE_ANIMATION_FRAMES].tolist()
+        return self.current_palette
+
+    def draw_tesseract(self, angles=None):
+        rotated = rotate_points(self.points, angles or self.angles, self.radius)
+        projected_2d = project_3d_to_2d(project_to_3d(rotated))
+        points_2d = (projected_2d * self.scale + self.center).astype(int)
+        palette = self.frame_palette()
+        if self.exporter is not None:
+            self.exporter.write(self.frame_count, self.sim_ticks, projected_2d, palette)
+        self.profiler.mark("geometry")
+
+        paths, dots = self.current_edge_paths()
+        if self.motion_blur and self.effective_blur_style() == 'trails':
+            self.draw_trails(points_2d, palette, paths, dots)
+
+        radius = max(1, self.px(5))
+        if self.culling:
+            lines, dot_points = self.cull(points_2d, paths, radius)
+            self.profiler.mark("cull")
+        else:
+            lines = [points_2d[path].tolist() for path in paths]
+            dot_points = points_2d.tolist()
 
-        for i, j in self.edges:
-            pygame.draw.line(self.game_surface, palette[1], (int(points_2d[i][0]), int(points_2d[i][1])), (int(points_2d[j][0]), int(points_2d[j][1])), 1)
+        antialias = self.antialias and self.governor.settings["antialias"]
+        line_width = max(1, round(self.ui_scale))
+        for line in lines:
+            if antialias:
+                pygame.draw.aalines(self.game_surface, palette[1], False, line)
+            else:
+                pygame.draw.lines(self.game_surface, palette[1], False, line, line_width)
 
-        for p in points_2d:
-            pygame.draw.circle(self.game_surface, palette[0], (int(p[0]), int(p[1])), 5)
+        if dots:
+            sprite = dot_sprite(palette[0], radius, antialias)
+            self.game_surface.blits([(sprite, (x - radius, y - radius)) for x, y in dot_points], False)
 
-    def run(self):
-        self.play_sound(startup_sound)
+    def run(self, max_frames=None):
+        self.play_sound("startup")
 
+        frames = 0
+        last_time = time.perf_counter()
         while self.running:
             self.frame_count += 1
-            for event in pygame.event.get():
+            self.profiler.begin_frame()
+            now = time.perf_counter()
+            elapsed = min(now - last_time, MAX_FRAME_TIME)
+            last_time = now
+            self.track_menu_state()
+            events = pygame.event.get()
+            if self.replayer is not None:
+                # only the trace drives a replay, one simulation step a frame
+                events = [event for event in events if event.type == pygame.QUIT] + self.replayer.events(self.sim_ticks)
+                elapsed = SIM_STEP
+            elif not events and self.state != 0 and self.menu_lines is not None and not self.menu_animating():
+                # an idle menu can't change until input arrives, so sleep on it
+                events = [pygame.event.wait(MENU_IDLE_TIMEOUT)] + pygame.event.get()
+                # the wait is not simulation time, or leaving the menu would
+                # catch the cube up by MAX_FRAME_TIME in a jump
+                last_time = time.perf_counter()
+                elapsed = 0.0
+                self.sim_accumulator = 0.0
+            if self.input_recorder is not None:
+                self.input_recorder.record(self.sim_ticks, events)
+            assets.update()
+            for event in events:
                 if event.type == pygame.QUIT:
                     self.running = False
-                elif self.state == 1:
-                    self.handle_main_menu_events(event)
-                elif self.state == 2:
-                    self.handle_palette_menu_events(event)
-                elif self.state == 3:
-                    self.handle_keybind_menu_events(event)
-                else:
-                    if event.type == pygame.KEYDOWN:
-                        if event.key == pygame.K_ESCAPE:
-                            self.state = 1
-                            self.chaos_mode = False
-                            # restore last palette when exiting chaos mode
-                            self.palette_set_idx = self.last_normal_palette_set
-                            self.palette_idx_in_set = self.last_normal_palette_idx
-                            self.update_current_palette()
-                            self.play_sound(escape_sound)
-                            pygame.mixer.music.stop()
-                        elif event.key == pygame.K_SPACE and not self.chaos_mode:
-                            self.palette_idx_in_set = (self.palette_idx_in_set + 1) % 10
-                            self.update_current_palette()
-                            self.play_sound(random.choice(beep_sounds))
-                        elif event.key == pygame.K_b:
-                            self.motion_blur = not self.motion_blur
-                            self.play_sound(random.choice(beep_sounds))
-                        elif event.key == pygame.K_m and (pygame.key.get_mods() & pygame.KMOD_SHIFT):
-                            if self.state == 0:
-                                self.state = 3
-                                self.keybind_fade.fade_in()
-                            elif self.state == 3:
-                                self.keybind_fade.fade_out()
-                                self.state = 0
-                            self.play_sound(random.choice(beep_sounds))
-                        elif event.key == pygame.K_p and (pygame.key.get_mods() & pygame.KMOD_SHIFT) and not self.chaos_mode:
-                            if self.state == 0:
-                                self.state = 2
-                                self.palette_fade.fade_in()
-                            elif self.state == 2:
-                                self.palette_fade.fade_out()
-                                self.state = 0
-                            self.play_sound(random.choice(beep_sounds))
-                        elif event.key == pygame.K_c:
-                            self.chaos_mode = not self.chaos_mode
-                            self.motion_blur = True
-                            self.play_sound(random.choice(beep_sounds))
-                            if self.chaos_mode:
-                                # preserves current palette before chaos mode
-                                self.last_normal_palette_set = self.palette_set_idx
-                                self.last_normal_palette_idx = self.palette_idx_in_set
-                                # start chaos mode cycling at current
-                                self.chaos_palette_set = self.palette_set_idx
-                                self.chaos_palette_idx = self.palette_idx_in_set
-                            else:
-                                # restore palette after chaos mode
-                                self.palette_set_idx = self.last_normal_palette_set
-                                self.palette_idx_in_set = self.last_normal_palette_idx
-                                self.update_current_palette()
-                        elif event.key == pygame.K_F11:
-                            self.toggle_fullscreen()
-                        elif (pygame.key.get_mods() & pygame.KMOD_SHIFT) and (pygame.K_1 <= event.key <= pygame.K_0 or event.key == pygame.K_0) and not self.chaos_mode:
-                            key_to_set = {
-                                pygame.K_1: 0,
-                                pygame.K_2: 1,
-                                pygame.K_3: 2,
-                                pygame.K_4: 3,
-                                pygame.K_5: 4,
-                                pygame.K_6: 5,
-                                pygame.K_7: 6,
-                                pygame.K_8: 7,
-                                pygame.K_9: 8,
-                                pygame.K_0: 9,
-                            }
-                            if event.key in key_to_set and self.state == 0:
-                                self.palette_set_idx = key_to_set[event.key]
-                                self.palette_idx_in_set = 0
-                                self.update_current_palette()
-                                self.play_sound(random.choice(beep_sounds))
+                elif event.type == pygame.VIDEORESIZE:
+                    self.resize()
+                elif event.type == pygame.KEYDOWN:
+                    self.held_keys[event.key] = True
+                    self.handle_key(event)
+                elif event.type == pygame.KEYUP:
+                    self.held_keys[event.key] = False
+            if self.control is not None:
+                for command in self.control.drain():
+                    self.apply_command(command)
+
+            self.profiler.mark("events")
 
             # draws everything to game_surface first
+            self.track_menu_state()
+            full_redraw = self.menu_lines is None
+            dirty = []
             if self.state == 1:
-                self.draw_main_menu()
+                dirty = self.draw_main_menu()
+                self.profiler.mark("draw")
             elif self.state == 2:
+                # the menu background is opaque, so the fade itself never shows
                 self.palette_fade.update()
-                self.palette_fade.draw(self.game_surface)
-                self.draw_palette_menu()
+                dirty = self.draw_palette_menu()
+                self.profiler.mark("draw")
             elif self.state == 3:
-                self.keybind_fade.update()
-                self.keybind_fade.draw(self.game_surface)
-                self.draw_keybind_menu()
+                # the overlay darkens the frozen frame over repeated blits,
+                # so it is redrawn only until that settles
+                if self.menu_animating():
+                    self.keybind_fade.update()
+                    self.keybind_fade.draw(self.game_surface)
+                    self.draw_keybind_menu()
+                    self.menu_lines = []
+                    dirty = [self.game_surface.get_rect()]
+                self.profiler.mark("draw")
             else:
-                if self.motion_blur:
-                    self.game_surface.blit(motion_blur_surface, (0, 0))
-                else:
-                    self.game_surface.fill((0, 0, 0))
+                self.clear_canvas()
+                self.profiler.mark("blur")
 
-                keys = pygame.key.get_pressed()
-                if self.control_style == 'auto':
-                    if self.chaos_mode:
-                        self.update_chaos_mode()
-                    self.update_angles_auto()
-                else:
-                    self.update_angles_manual(keys)
-
-                self.draw_tesseract()
+                self.advance_simulation(elapsed, self.held_keys)
+                self.profiler.mark("update")
 
-                self.draw_text("WASD/QE: Rotate (manual)", (10, 10), font, (180, 180, 180))
-                self.draw_text("SPACE: Cycle palette in set", (10, 40), font, (180, 180, 180))
-                self.draw_text("B: Toggle motion blur", (10, 70), font, (180, 180, 180))
-                self.draw_text("ESC: Return to menu", (10, 100), font, (180, 180, 180))
-                self.draw_text("SHIFT+M: Toggle keybind menu", (10, 130), font, (180, 180, 180))
-                self.draw_text("SHIFT+P: Toggle palette menu", (10, 160), font, (180, 180, 180))
-                self.draw_text("C: Toggle Chaos Mode", (10, 190), font, (180, 180, 180))
-                self.draw_text("F11: Toggle fullscreen", (10, 220), font, (180, 180, 180))
-                self.draw_text(f"Control: {self.control_style.capitalize()} | Palette Set: {self.palette_set_idx+1} | Palette #: {self.palette_idx_in_set+1}", (10, GAME_SIZE - 30), font, (180, 180, 180))
+                if self.instances is not None:
+                    self.draw_instances()
+                elif self.view_grid is not None:
+                    self.draw_views(self.interpolated_angles())
+                else:
+                    self.draw_tesseract(self.interpolated_angles())
+                self.profiler.mark("draw")
+                self.render_bloom()
+                self.profiler.mark("bloom")
 
-                if self.chaos_mode:
-                    chaos_text = "CHAOS MODE ACTIVE"
-                    self.draw_text(chaos_text, (GAME_SIZE - big_font.size(chaos_text)[0] - 20, 20), big_font, (255, 50, 50))
+                if self.governor.settings["hud"]:
+                    self.draw_hud()
+                self.profiler.draw_overlay(self.game_surface, self.frame_count)
 
                 if self.show_keybinds and self.state == 0:
                     self.keybind_fade.update()
                     self.keybind_fade.draw(self.game_surface)
                     self.draw_keybind_menu()
-
-            # scale and blit game_surface to display_surface
-            if self.fullscreen:
-                dw, dh = self.display_surface.get_size()
-                size = min(dw, dh)
-                scaled = pygame.transform.smoothscale(self.game_surface, (size, size))
-                x = (dw - size) // 2
-                y = (dh - size) // 2
-                self.display_surface.fill((0, 0, 0))
-                self.display_surface.blit(scaled, (x, y))
+                self.profiler.mark("hud")
+
+            if self.menu_settle_frames:
+                self.menu_settle_frames -= 1
+
+            # upscales game_surface when rendering below native resolution
+            if self.state == 0 or full_redraw or dirty:
+                self.present()
+                self.profiler.mark("scale")
+                self.recorder.capture(self.view)
+                if self.recorder.full():
+                    print(f"Recording stopped at the {self.recorder.max_frames} frame GIF limit")
+                    self.toggle_recording()
+                elif self.recorder.recording and self.frame_count % 30 == 0:
+                    pygame.display.set_caption(f"4D Cube (Tesseract) - {self.recorder.status()}")
+                self.profiler.mark("record")
+            if self.state == 0 or full_redraw:
+                pygame.display.flip()
+            elif dirty:
+                if self.game_surface is self.view:
+                    pygame.display.update([rect.move(self.view_rect.topleft) for rect in dirty])
+                else:
+                    pygame.display.update(self.view_rect)
+            self.profiler.mark("flip")
+            if self.state == 0 and self.governor.record((time.perf_counter() - now) * 1000):
+                self.apply_quality()
+                print(f"Quality tier {self.governor.tier} ({self.governor.settings['name']})")
+            frames += 1
+            if max_frames is not None and frames >= max_frames:
+                self.running = False
+            elif self.replayer is not None and self.replayer.done:
+                self.running = False
             else:
-                self.display_surface.blit(self.game_surface, (0, 0))
-
-            pygame.display.flip()
-            clock.tick(60)
-
+                clock.tick(self.max_fps)
+            self.profiler.mark("wait")
+            self.profiler.end_frame(self.frame_count, self.governor.tier, self.cull_stats if self.culling else None)
+
+        if self.control is not None:
+            self.control.stop()
+        if self.exporter is not None:
+            self.exporter.close()
+        if self.input_recorder is not None:
+            self.input_recorder.close()
+            print(f"Recorded {self.input_recorder.count} input events")
+        self.recorder.stop()
+        self.profiler.close()
+        assets.close()
         pygame.quit()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rotating hypercube visualizer")
+    parser.add_argument("--dims", type=int, default=DEFAULT_DIMENSIONS,
+                        choices=range(MIN_DIMENSIONS, MAX_DIMENSIONS + 1), metavar="N",
+                        help=f"hypercube dimension, {MIN_DIMENSIONS} to {MAX_DIMENSIONS} (default {DEFAULT_DIMENSIONS})")
+    parser.add_argument("--shape", choices=SHAPES, default=SHAPES[0],
+                        help="polytope to show; the 24-, 600- and 120-cell are 4D and ignore --dims (default hypercube)")
+    parser.add_argument("--vertices", metavar="FILE",
+                        help="show your own polytope: one vertex per line, coordinates separated by spaces or commas; "
+                             "edges join the closest pairs")
+    parser.add_argument("--render-scale", type=float, default=1.0, metavar="S",
+                        help="render at this fraction of the window resolution and upscale, 0.25 to 1 (default 1)")
+    parser.add_argument("--fps", type=int, default=60,
+                        help="frame rate cap, 0 for uncapped; animation speed does not depend on it (default 60)")
+    parser.add_argument("--seed", type=seed_arg,
+                        help="seed for the rotation speeds and chaos mode, so runs repeat exactly (default random)")
+    parser.add_argument("--antialias", action="store_true", help="start with anti-aliased edges and vertices")
+    parser.add_argument("--cull", action="store_true",
+                        help="skip edges and vertices that are off screen, zero length or on top of one already drawn; "
+                             "the profiler overlay (F3) shows how many")
+    parser.add_argument("--max-edges", type=int, metavar="N",
+                        help="draw at most N edges a frame, longest first; implies --cull")
+    parser.add_argument("--instances", type=int, default=1, metavar="N",
+                        help="draw a field of N independently rotating copies instead of one (default 1)")
+    parser.add_argument("--views", metavar="NAMES",
+                        help="split the screen into one tile per comma-separated view: " + ", ".join(VIEW_PRESETS))
+    parser.add_argument("--blur", choices=BLUR_STYLES, default=BLUR_STYLES[0],
+                        help="motion blur style: fade the whole screen, or redraw vertex and edge trails (default screen)")
+    parser.add_argument("--bloom", action="store_true", help="start with the glow effect on (toggle with G)")
+    parser.add_argument("--bloom-radius", type=int, default=BLOOM_RADIUS, metavar="PX",
+                        help=f"glow blur radius in glow-buffer pixels; each coarser level doubles it (default {BLOOM_RADIUS})")
+    parser.add_argument("--bloom-scale", type=float, default=BLOOM_SCALE, metavar="S",
+                        help=f"glow buffer resolution as a fraction of the canvas, 0.05 to 0.5 (default {BLOOM_SCALE})")
+    parser.add_argument("--control-port", type=int, metavar="PORT",
+                        help=f"accept text commands over UDP on localhost, e.g. {CONTROL_PORT}; see control_client.py")
+    parser.add_argument("--export-geometry", nargs="?", const=DEFAULT_GEOMETRY_PATH, metavar="PATH",
+                        help=f"stream projected vertices, edges and palette to a memory-mapped file (default {DEFAULT_GEOMETRY_PATH})")
+    parser.add_argument("--adaptive-quality", action="store_true",
+                        help="lower rendering quality while frames run over --target-ms, and restore it when they recover")
+    parser.add_argument("--target-ms", type=float, metavar="MS",
+                        help="frame time budget for --adaptive-quality, excluding the frame cap wait (default 1000/fps)")
+    parser.add_argument("--profile-csv", metavar="PATH",
+                        help="record per-stage frame timings to a CSV file")
+    parser.add_argument("--record-format", choices=RECORD_FORMATS, default=RECORD_FORMATS[0],
+                        help="what F9 records: a PNG sequence, an animated GIF (needs Pillow; held in memory, so it stops "
+                             f"by itself after {GIF_MAX_BYTES >> 20} MB of frames, {GIF_MAX_BYTES // GAME_SIZE ** 2} at "
+                             f"{GAME_SIZE}x{GAME_SIZE}) or raw RGB24 video (default png)")
+    parser.add_argument("--record-dir", default="recordings", metavar="DIR",
+                        help="where recordings are written (default ./recordings)")
+    parser.add_argument("--record-scale", type=float, default=1.0, metavar="S",
+                        help="record at this fraction of the window resolution, 0.1 to 1 (default 1)")
+    parser.add_argument("--keymap", metavar="FILE",
+                        help="key bindings to apply over the defaults, one 'state key action [arg]' per line; "
+                             "see DEFAULT_KEYMAP for the format")
+    parser.add_argument("--record-input", metavar="FILE",
+                        help="write every key press and release to a trace that --replay-input plays back")
+    parser.add_argument("--replay-input", metavar="FILE",
+                        help="replay a recorded trace headlessly and uncapped, with its shape, dimensions and seed, "
+                             "then exit")
+    args = parser.parse_args()
+    if not 0.25 <= args.render_scale <= 1:
+        parser.error("--render-scale must be between 0.25 and 1")
+    if not 0.1 <= args.record_scale <= 1:
+        parser.error("--record-scale must be between 0.1 and 1")
+    if args.max_edges is not None and args.max_edges < 1:
+        parser.error("--max-edges must be at least 1")
+    if not 0.05 <= args.bloom_scale <= 0.5 or args.bloom_radius < 0:
+        parser.error("--bloom-scale must be between 0.05 and 0.5 and --bloom-radius at least 0")
+    views = args.views.split(",") if args.views else None
+    if views and any(name not in VIEW_PRESETS for name in views):
+        parser.error(f"--views takes names from: {', '.join(VIEW_PRESETS)}")
+    keymap = None
+    if args.keymap:
+        try:
+            with open(args.keymap) as f:
+                keymap = f.read()
+        except OSError as e:
+            parser.error(f"--keymap: {e}")
+    replayer = None
+    if args.replay_input:
+        try:
+            replayer = InputReplayer(args.replay_input)
+        except (OSError, ValueError) as e:
+            parser.error(f"--replay-input: {e}")
+        if replayer.shape_idx == CUSTOM_SHAPE and not args.vertices:
+            parser.error("--replay-input: this trace was recorded with --vertices; pass the same file")
+        if replayer.shape_idx != CUSTOM_SHAPE:
+            args.shape = SHAPES[replayer.shape_idx]
+            args.vertices = None
+        args.dims, args.seed, args.fps = replayer.dims, replayer.seed, 0
+        # nothing is shown or heard, so no window or audio device is needed
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    vertices = None
+    if args.vertices:
+        try:
+            with open(args.vertices) as f:
+                vertices = np.loadtxt((line.replace(",", " ") for line in f), ndmin=2)
+        except (OSError, ValueError) as e:
+            parser.error(f"could not read --vertices: {e}")
+        if not MIN_DIMENSIONS <= vertices.shape[1] <= MAX_DIMENSIONS or len(np.unique(vertices, axis=0)) < 2:
+            parser.error(f"--vertices needs at least 2 distinct points with {MIN_DIMENSIONS} to {MAX_DIMENSIONS} coordinates")
+
     try:
-        app = TesseractApp()
+        app = TesseractApp(dimensions=args.dims, seed=args.seed, render_scale=args.render_scale,
+                           shape=args.shape, vertices=vertices)
+        app.antialias = args.antialias
+        app.culling = args.cull or args.max_edges is not None
+        app.max_segments = args.max_edges
+        app.blur_style = args.blur
+        app.set_instances(args.instances)
+        try:
+            app.set_views(views)
+        except ValueError as e:
+            parser.error(f"--views: {e}")
+        # key names only resolve once pygame is initialised
+        try:
+            app.set_keymap(keymap)
+        except ValueError as e:
+            parser.error(f"--keymap: {e}")
+        app.max_fps = args.fps
+        app.governor.target_ms = args.target_ms or 1000 / (args.fps or 60)
+        app.set_quality_governor(args.adaptive_quality)
+        app.bloom_options = (args.bloom_scale, args.bloom_radius)
+        app.set_bloom(args.bloom, *app.bloom_options)
+        if args.control_port:
+            app.start_control_server(args.control_port)
+        if args.export_geometry:
+            app.start_geometry_export(args.export_geometry)
+        if args.profile_csv:
+            app.profiler.open_csv(args.profile_csv)
+        app.recorder = FrameRecorder(args.record_format, args.record_dir, args.record_scale)
+        app.replayer = replayer
+        if args.record_input:
+            app.input_recorder = InputRecorder(args.record_input, app.shape_idx, app.dimensions, app.seed)
         app.run()
     except Exception as e:
         import traceback
@@ -0,0 +1,47 @@
+import numpy as np
+
+import tesseract
+
+
+def cull(points, size=800, radius=5, max_segments=None):
+    # one polyline through all the points
+    points = np.asarray(points, dtype=float)
+    flat = np.arange(len(points))
+    valid = np.ones(len(points) - 1, dtype=bool)
+    return tesseract.cull_segments(points, flat, valid, size, radius, max_segments)
+
+
+def test_empty_result():
+    # every segment is zero length, so none is left to draw
+    keep, zero, off, dots = cull([[10, 10], [10.4, 10.2], [10.1, 10.9]])
+    assert not keep.any() and not off.any()
+    assert zero.all()
+    assert len(dots) == 1
+
+
+def test_no_segments():
+    keep, zero, off, dots = tesseract.cull_segments(
+        np.zeros((0, 2)), np.array([0]), np.zeros(0, dtype=bool), 800, 5)
+    assert len(keep) == len(zero) == len(off) == len(dots) == 0
+
+
+def test_all_off_screen():
+    keep, zero, off, dots = cull([[5000, 5000], [6000, 5000], [7000, 5000]])
+    assert not keep.any() and not zero.any() and not off.any()
+    assert len(dots) == 0
+
+
+def test_off_screen_bridge():
+    # the third segment lies right of the canvas between two drawn ones, so
+    # it stays in the polyline; the last one ends it and is dropped
+    keep, zero, off, dots = cull([[10, 10], [700, 10], [900, 20], [900, 40], [700, 40], [900, 60], [950, 60]])
+    assert keep.tolist() == [True, True, False, True, True, False]
+    assert off.tolist() == [False, False, True, False, False, False]
+
+
+def test_cap_counts_off_screen():
+    points = [[10, 10], [700, 10], [900, 20], [900, 40], [700, 40], [100, 40]]
+    keep, zero, off, dots = cull(points, max_segments=4)
+    assert keep.sum() + off.sum() == 4 and not off.any()
+    keep, zero, off, dots = cull(points, max_segments=1)
+    assert keep.tolist() == [True, False, False, False, False]